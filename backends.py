@@ -0,0 +1,149 @@
+import heapq
+import multiprocessing
+import threading
+import time
+from task_table import TaskTable
+
+# Task backends decide what a simulated task's worker actually runs on. Each
+# backend hands out the synchronisation primitives a ProcessCreate needs and
+# starts/stops its worker.
+
+
+# One OS process per task. Events are plain multiprocessing primitives
+# inherited by the child and task state lives in shared memory, so no Manager
+# server is needed. Workers are daemons, so exiting never waits on one.
+class ProcessBackend:
+    name = "process"
+
+    def make_event(self):
+        return multiprocessing.Event()
+
+    def make_table(self, capacity):
+        return TaskTable(capacity, shared=True)
+
+    def start(self, task):
+        handle = multiprocessing.Process(target=task.worker, daemon=True)
+        handle.start()
+        return handle
+
+    def stop(self, handle):
+        if handle.is_alive():
+            handle.terminate()
+            handle.join()
+
+
+class InProcessBackend:
+    def make_event(self):
+        return threading.Event()
+
+    def make_table(self, capacity):
+        return TaskTable(capacity)
+
+
+# One lightweight daemon thread per task
+class ThreadBackend(InProcessBackend):
+    name = "thread"
+
+    def start(self, task):
+        handle = threading.Thread(target=task.worker, daemon=True)
+        handle.start()
+        return handle
+
+    def stop(self, handle):
+        # The worker returns on its own once its shutdown_flag is set
+        pass
+
+
+# Every task is a generator (ProcessCreate.steps) advanced by a single driver
+# thread, so thousands of tasks cost one thread and a heap entry each. A
+# generator that yields one of the backend's events is parked on it and only
+# goes back on the heap when the event is set, so paused tasks cost nothing.
+class GeneratorBackend(InProcessBackend):
+    name = "generator"
+
+    def __init__(self):
+        self.timers = []
+        self.seq = 0
+        self.wakeup = threading.Condition()
+        self.thread = None
+
+    def make_event(self):
+        return DriverEvent(self)
+
+    def start(self, task):
+        steps = task.steps()
+        with self.wakeup:
+            self.push(time.monotonic(), steps)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.drive, daemon=True)
+                self.thread.start()
+        return steps
+
+    def stop(self, handle):
+        # The generator finishes on its next step once its shutdown_flag is set
+        pass
+
+    def push(self, when, steps):
+        self.seq += 1
+        heapq.heappush(self.timers, (when, self.seq, steps))
+        self.wakeup.notify()
+
+    def drive(self):
+        while True:
+            with self.wakeup:
+                while not self.timers:
+                    self.wakeup.wait()
+                when, _, steps = self.timers[0]
+                delay = when - time.monotonic()
+                if delay > 0:
+                    self.wakeup.wait(delay)
+                    continue
+                heapq.heappop(self.timers)
+            try:
+                step = next(steps)
+            except StopIteration:
+                continue
+            with self.wakeup:
+                if not isinstance(step, DriverEvent):
+                    self.push(time.monotonic() + step, steps)
+                elif step.flag:
+                    self.push(time.monotonic(), steps)
+                else:
+                    step.parked.append(steps)
+
+
+# The event a GeneratorBackend hands out. set() and the driver's parking
+# both run under the backend's lock, so a wakeup is never lost.
+class DriverEvent:
+    def __init__(self, backend):
+        self.backend = backend
+        self.flag = False
+        self.parked = []
+
+    def is_set(self):
+        return self.flag
+
+    def set(self):
+        with self.backend.wakeup:
+            self.flag = True
+            for steps in self.parked:
+                self.backend.push(time.monotonic(), steps)
+            self.parked.clear()
+
+    def clear(self):
+        self.flag = False
+
+
+BACKENDS = {
+    ProcessBackend.name: ProcessBackend,
+    ThreadBackend.name: ThreadBackend,
+    GeneratorBackend.name: GeneratorBackend,
+}
+
+
+def make_backend(backend):
+    if isinstance(backend, str):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown task backend '{backend}', expected one of {', '.join(BACKENDS)}")
+        return BACKENDS[backend]()
+    return backend
@@ -0,0 +1,184 @@
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from events import EventChannel
+from policies import POLICIES, make_run_queue
+from simulation import Simulation
+from task import SchedTunables, TaskAccount
+from wait_queue import WaitQueue
+from weights import NSEC_PER_SEC, nice_to_weight
+from workload import Workload
+
+# Per-operation cost of the scheduling hot paths at several task counts, with
+# fixed seeds so runs are comparable between versions. Each case is timed
+# REPEATS times and the fastest and median ns/op are reported, pyperf style.
+# Save a baseline with --json and check a later version against it with
+# --compare; the exit status is 1 if any case got slower than --threshold.
+# Run from the repository root: python -m benchmarks.bench_hot_path
+
+TASK_COUNTS = [16, 256, 4096]
+SEED = 7
+REPEATS = 5
+OPS = 20000
+TUNABLES = SchedTunables()
+
+
+def make_processes(count, seed=SEED):
+    rng = random.Random(seed)
+    processes = []
+    for i in range(count):
+        p = TaskAccount()
+        p.weight_calculate(rng.randint(-10, 10))
+        p.vRuntime = rng.randrange(NSEC_PER_SEC)
+        processes.append({"name": f"pro{i}", "process_obj": p, "weight": p.weight, "vRuntime": p.vRuntime})
+    return processes
+
+
+# Every case takes a task count and returns a function that runs OPS operations
+def pick_and_tick(policy):
+    def setup(count):
+        run_queue = make_run_queue(policy, TUNABLES)
+        for process in make_processes(count):
+            run_queue.place(process)
+            run_queue.enqueue(process)
+
+        def run():
+            for _ in range(OPS):
+                process = run_queue.pick_next()
+                run_queue.tick(process, run_queue.time_slice(process))
+        return run
+    return setup
+
+
+def calculate_vruntime(count):
+    processes = make_processes(count)
+
+    def run():
+        for i in range(OPS):
+            process = processes[i % count]
+            process["process_obj"].calculate_vRuntime(process["weight"], 3000000)
+    return run
+
+
+def renice(count):
+    run_queue = make_run_queue("cfs", TUNABLES)
+    processes = make_processes(count)
+    for process in processes:
+        run_queue.enqueue(process)
+    weights = [nice_to_weight(nice) for nice in range(-10, 11)]
+
+    def run():
+        for i in range(OPS):
+            run_queue.reweight(processes[i % count], weights[i % len(weights)])
+    return run
+
+
+def wait_queue(count):
+    processes = make_processes(count)
+    rng = random.Random(SEED)
+    deadlines = [rng.random() for _ in range(count)]
+
+    def run():
+        queue = WaitQueue()
+        done = 0
+        while done < OPS:
+            for process, deadline in zip(processes, deadlines):
+                queue.add(process, deadline)
+            done += count + len(queue.pop_expired(1.0))
+    return run
+
+
+def event_channel(count):
+    names = [f"pro{i}" for i in range(count)]
+
+    def run():
+        channel = EventChannel(capacity=OPS)
+        for i in range(OPS):
+            name = names[i % count]
+            if i % 4:
+                channel.put({"name": name, "vRuntime": 0.0, "time_slice": 0.0, "cpu": i % 4, "status": "running"})
+            else:
+                channel.put({"name": name, "status": "io_start", "duration": 1.0})
+            if i % 256 == 0:
+                channel.drain()
+        channel.drain()
+    return run
+
+
+def simulation(count):
+    # Whole event loop, reported per dispatch rather than per OPS
+    workload = Workload(tasks=count, nice="choice:-5,0,5", cpu_burst="exp:0.002", io_burst="exp:0.01",
+                        exe_time="uniform:0.01,0.05", interarrival="exp:0.001")
+
+    def run():
+        sim = Simulation(seed=SEED, num_cpus=4, tunables=SchedTunables(6000000, 750000), workload=workload)
+        sim.run_workload()
+        return sim.dispatches
+    return run
+
+
+CASES = {f"pick_tick.{policy}": pick_and_tick(policy) for policy in POLICIES}
+CASES.update({
+    "calculate_vruntime": calculate_vruntime,
+    "renice": renice,
+    "wait_queue": wait_queue,
+    "event_channel": event_channel,
+    "simulation": simulation,
+})
+
+
+def measure(setup, count):
+    timings = []
+    for _ in range(REPEATS):
+        run = setup(count)
+        started = time.perf_counter_ns()
+        ops = run() or OPS
+        timings.append((time.perf_counter_ns() - started) / ops)
+    return {"best": min(timings), "median": statistics.median(timings)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the scheduler hot paths")
+    parser.add_argument("--cases", default=None, help="comma separated case names, default all")
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    parser.add_argument("--compare", default=None, help="results file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.10, help="slowdown ratio counted as a regression")
+    args = parser.parse_args()
+
+    cases = CASES if args.cases is None else {name: CASES[name] for name in args.cases.split(",")}
+    baseline = {}
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    print(f"seed {SEED}, {REPEATS} repeats of {OPS} ops, ns per op")
+    print(f"{'case':>20} {'tasks':>6} {'best':>10} {'median':>10} {'baseline':>10} {'ratio':>7}")
+    results = {}
+    regressions = []
+    for name, setup in cases.items():
+        for count in TASK_COUNTS:
+            key = f"{name}/{count}"
+            row = results[key] = measure(setup, count)
+            line = f"{name:>20} {count:>6} {row['best']:>10.1f} {row['median']:>10.1f}"
+            if key in baseline:
+                ratio = row["best"] / baseline[key]["best"]
+                line += f" {baseline[key]['best']:>10.1f} {ratio:>6.2f}x"
+                if ratio > args.threshold:
+                    regressions.append(key)
+                    line += "  slower"
+            print(line)
+
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump({"seed": SEED, "repeats": REPEATS, "ops": OPS, "python": sys.version.split()[0],
+                       "results": results}, f, indent=2)
+    if regressions:
+        print(f"{len(regressions)} regressions over {args.threshold:.2f}x: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
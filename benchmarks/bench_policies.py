@@ -0,0 +1,50 @@
+import time
+from policies import POLICIES
+from simulation import Simulation
+from task import SchedTunables
+from workload import Workload
+
+# Runs the same seeded workloads through every scheduling policy and reports
+# the wall-clock cost per scheduling decision, throughput and tail latencies.
+# Run from the repository root: python -m benchmarks.bench_policies
+
+WORKLOADS = {
+    "batch": Workload(tasks=256, nice="choice:-5,0,5"),
+    "interactive": Workload(tasks=256, nice="0", cpu_burst="exp:0.2", io_burst="exp:1", interarrival="exp:0.1"),
+    "mixed": Workload(tasks=256, nice="choice:-10,0,10", cpu_burst="exp:1", io_burst="uniform:0.5,4",
+                      interarrival="exp:0.5"),
+}
+CPUS = 4
+SEEDS = [1, 2, 3]
+TUNABLES = SchedTunables()
+
+
+def run(policy, workload, seed):
+    sim = Simulation(seed=seed, num_cpus=CPUS, tunables=TUNABLES, workload=workload, policy=policy)
+    started = time.perf_counter()
+    sim_time = sim.run_workload()
+    elapsed = time.perf_counter() - started
+    report = sim.metrics.report(sim.clock)
+    return {
+        "us_per_decision": elapsed / max(sim.dispatches, 1) * 1e6,
+        "throughput": report["finished"] / sim_time,
+        "wait_p99": report["wait_p99"],
+        "turnaround_p99": report["turnaround_p99"],
+        "fairness": report["fairness"],
+    }
+
+
+def main():
+    print(f"{CPUS} CPUs, seeds {SEEDS}, averaged per workload")
+    print(f"{'workload':>12} {'policy':>8} {'us/decision':>12} {'tasks/s':>9} {'wait p99':>10} "
+          f"{'turnaround p99':>15} {'fairness':>9}")
+    for name, workload in WORKLOADS.items():
+        for policy in POLICIES:
+            rows = [run(policy, workload, seed) for seed in SEEDS]
+            mean = {key: sum(row[key] for row in rows) / len(rows) for key in rows[0]}
+            print(f"{name:>12} {policy:>8} {mean['us_per_decision']:>12.2f} {mean['throughput']:>9.3f} "
+                  f"{mean['wait_p99']:>9.2f}s {mean['turnaround_p99']:>14.2f}s {mean['fairness']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
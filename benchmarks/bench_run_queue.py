@@ -0,0 +1,51 @@
+import random
+import time
+from run_queue import RunQueue
+
+# Pick-next cost of the old sort-per-tick list against the RunQueue timeline.
+# Run from the repository root: python -m benchmarks.bench_run_queue
+
+TASK_COUNTS = [10, 1000, 100000]
+
+
+def make_processes(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {"name": f"pro{i}", "weight": 1024, "vRuntime": rng.uniform(0, 100)}
+        for i in range(count)
+    ]
+
+
+def bench_list(processes, picks):
+    process_list = list(processes)
+    start = time.perf_counter()
+    for _ in range(picks):
+        process_list.sort(key=lambda x: x["vRuntime"])
+        process = process_list[0]
+        process["vRuntime"] += 1.0
+    return (time.perf_counter() - start) / picks
+
+
+def bench_run_queue(processes, picks):
+    run_queue = RunQueue()
+    for process in processes:
+        run_queue.enqueue(process)
+    start = time.perf_counter()
+    for _ in range(picks):
+        process = run_queue.pick_next()
+        process["vRuntime"] += 1.0
+        run_queue.update(process)
+    return (time.perf_counter() - start) / picks
+
+
+def main():
+    print(f"{'tasks':>8} {'list sort (us)':>16} {'run queue (us)':>16} {'speedup':>9}")
+    for count in TASK_COUNTS:
+        picks = max(10, min(10000, 1000000 // count))
+        list_cost = bench_list(make_processes(count), picks)
+        rq_cost = bench_run_queue(make_processes(count), 10000)
+        print(f"{count:>8} {list_cost * 1e6:>16.2f} {rq_cost * 1e6:>16.2f} {list_cost / rq_cost:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+from simulation import Simulation
+from task import SchedTunables
+from weights import NSEC_PER_SEC
+
+# Context switches per simulated second with a fixed scheduling period (every
+# slice shrinks as tasks are added) versus a period that stretches once more
+# than nr_latency tasks are runnable.
+# Run from the repository root: python -m benchmarks.bench_time_slice
+
+TASK_COUNTS = [4, 8, 64, 512, 4096]
+HORIZON = 120
+SEED = 42
+
+
+def switches_per_second(count, tunables):
+    sim = Simulation(seed=SEED, tunables=tunables)
+    sim_time = sim.run([f"pro{i}" for i in range(count)], [0] * count, until=HORIZON)
+    return sim.context_switches / sim_time, sim.dispatches
+
+
+def main():
+    fixed = SchedTunables(min_granularity=0)
+    dynamic = SchedTunables()
+    print(f"latency {dynamic.latency / NSEC_PER_SEC:.2f}s, min_granularity {dynamic.min_granularity / NSEC_PER_SEC:.2f}s, "
+          f"nr_latency {dynamic.nr_latency}, horizon {HORIZON}s")
+    print(f"{'tasks':>8} {'fixed period (sw/s)':>20} {'dynamic period (sw/s)':>22} {'reduction':>10}")
+    for count in TASK_COUNTS:
+        fixed_rate, _ = switches_per_second(count, fixed)
+        dynamic_rate, _ = switches_per_second(count, dynamic)
+        print(f"{count:>8} {fixed_rate:>20.2f} {dynamic_rate:>22.2f} {fixed_rate / dynamic_rate:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
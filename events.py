@@ -0,0 +1,67 @@
+import threading
+from collections import deque
+
+# Bounded, in-process event stream from the scheduler to the Scene. The
+# producer put()s the same message dicts it used to push through a Manager
+# queue; the consumer takes everything queued in one drain() per frame.
+#
+# A "running" message that has not been drained yet is superseded by the
+# next "running" message for the same CPU, so a slow consumer only sees the
+# latest dispatch per CPU. The old entry is marked dead and the new message
+# goes to the tail, so it still comes after everything queued before it
+# (a task's "new" or "io_complete", say). Any other message about the task in
+# that slot closes it first. When the buffer is full, put() blocks until the
+# consumer catches up, or returns False at once with block=False.
+class EventChannel:
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.entries = deque()
+        self.running = {}
+        self.dead = 0
+        self.not_full = threading.Condition()
+        self.coalesced = 0
+        self.blocked = 0
+
+    def __len__(self):
+        return len(self.entries) - self.dead
+
+    def put(self, message, block=True, timeout=None):
+        with self.not_full:
+            superseded = False
+            if message["status"] == "running":
+                cpu = message.get("cpu", 0)
+                entry = self.running.pop(cpu, None)
+                if entry is not None:
+                    superseded = True
+                    entry[0] = None
+                    self.dead += 1
+                    self.coalesced += 1
+                    if self.dead > self.capacity:
+                        self.compact()
+            else:
+                for cpu, entry in list(self.running.items()):
+                    if entry[0]["name"] == message["name"]:
+                        del self.running[cpu]
+            # A superseded dispatch frees its place, so coalescing never waits
+            while len(self) >= self.capacity and not superseded:
+                self.blocked += 1
+                if not block or not self.not_full.wait(timeout):
+                    return False
+            entry = [message]
+            self.entries.append(entry)
+            if message["status"] == "running":
+                self.running[message.get("cpu", 0)] = entry
+            return True
+
+    def compact(self):
+        self.entries = deque(entry for entry in self.entries if entry[0] is not None)
+        self.dead = 0
+
+    def drain(self):
+        with self.not_full:
+            batch = [entry[0] for entry in self.entries if entry[0] is not None]
+            self.entries.clear()
+            self.running.clear()
+            self.dead = 0
+            self.not_full.notify_all()
+        return batch
@@ -0,0 +1,243 @@
+from array import array
+from weights import NSEC_PER_SEC
+
+# Log-linear histogram resolution: every power of two is split into
+# 2**SUB_BITS buckets, so recorded values are within ~6% of the truth
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS
+BUCKETS = 64 * SUB_BUCKETS
+
+
+# Fixed-size histogram of nanosecond durations
+class Histogram:
+    def __init__(self):
+        self.counts = array("q", bytes(8 * BUCKETS))
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def record(self, value):
+        value = max(int(value), 0)
+        self.counts[bucket_of(value)] += 1
+        self.total += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct):
+        if self.total == 0:
+            return 0
+        target = max(1, -(-self.total * pct // 100))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(bucket_upper(bucket), self.max)
+        return self.max
+
+    def mean(self):
+        return self.sum / self.total if self.total else 0
+
+
+def bucket_of(value):
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + ((value >> shift) - SUB_BUCKETS)
+
+
+def bucket_upper(bucket):
+    if bucket < SUB_BUCKETS:
+        return bucket
+    shift = bucket // SUB_BUCKETS - 1
+    return ((bucket % SUB_BUCKETS + SUB_BUCKETS + 1) << shift) - 1
+
+
+# Per-task scheduling statistics in preallocated, slot-indexed counters plus
+# histograms of the latencies between them. The scheduler calls the on_*
+# hooks with its own clock (ns) at each state transition; report() can be
+# called at any time. A task's totals are folded into running aggregates
+# when it exits; with recycle=True its slot is then reused by the next task,
+# so an open system with endless arrivals keeps only its live tasks (and
+# task(slot) is only meaningful while the task is alive).
+class Metrics:
+    def __init__(self, capacity=64, recycle=False):
+        self.capacity = 0
+        self.recycle = recycle
+        self.names = []
+        self.groups = []
+        self.free = []
+        self.registered = 0
+        # Totals of the tasks that have exited
+        self.finished = 0
+        self.finished_wait = 0
+        self.finished_run = 0
+        self.finished_switches = 0
+        self.finished_groups = {}
+        # Sum, sum of squares and count of their service rates (see fairness)
+        self.finished_rates = [0.0, 0.0, 0]
+        self.arrival = array("q")
+        self.ready_since = array("q")
+        self.run_start = array("q")
+        self.first_run = array("q")
+        self.exit_time = array("q")
+        self.wait_time = array("q")
+        self.run_time = array("q")
+        self.switches = array("q")
+        self.vruntime = array("q")
+        self.grow(capacity)
+        self.wait_hist = Histogram()
+        self.first_run_hist = Histogram()
+        self.slice_hist = Histogram()
+        self.turnaround_hist = Histogram()
+
+    def grow(self, capacity):
+        extra = capacity - self.capacity
+        for column in (self.arrival, self.ready_since, self.run_start, self.first_run, self.exit_time,
+                       self.wait_time, self.run_time, self.switches, self.vruntime):
+            column.extend(array("q", bytes(8 * extra)))
+        for column in (self.ready_since, self.run_start, self.first_run, self.exit_time):
+            column[self.capacity:capacity] = array("q", [-1]) * extra
+        self.capacity = capacity
+
+    def register(self, name, now, group=None):
+        self.registered += 1
+        if self.free:
+            slot = self.free.pop()
+            self.names[slot] = name
+            self.groups[slot] = group
+            for column in (self.run_start, self.first_run, self.exit_time):
+                column[slot] = -1
+            for column in (self.wait_time, self.run_time, self.switches, self.vruntime):
+                column[slot] = 0
+        else:
+            slot = len(self.names)
+            if slot >= self.capacity:
+                self.grow(max(1, self.capacity * 2))
+            self.names.append(name)
+            self.groups.append(group)
+        self.arrival[slot] = now
+        self.ready_since[slot] = now
+        return slot
+
+    def live(self):
+        return (slot for slot in range(len(self.names)) if self.names[slot] is not None and self.exit_time[slot] < 0)
+
+    def on_runnable(self, slot, now):
+        self.ready_since[slot] = now
+
+    def on_run(self, slot, now):
+        wait = now - self.ready_since[slot]
+        self.wait_time[slot] += wait
+        self.wait_hist.record(wait)
+        self.ready_since[slot] = -1
+        self.run_start[slot] = now
+        self.switches[slot] += 1
+        if self.first_run[slot] < 0:
+            self.first_run[slot] = now
+            self.first_run_hist.record(now - self.arrival[slot])
+
+    def on_stop(self, slot, now, vruntime_delta, runnable=True):
+        ran = now - self.run_start[slot]
+        self.run_time[slot] += ran
+        self.slice_hist.record(ran)
+        self.run_start[slot] = -1
+        self.vruntime[slot] += vruntime_delta
+        self.ready_since[slot] = now if runnable else -1
+
+    def on_block(self, slot, now):
+        # Picked while already blocked: the time queued still counts as waiting
+        if self.ready_since[slot] >= 0:
+            self.wait_time[slot] += now - self.ready_since[slot]
+        self.ready_since[slot] = -1
+
+    def on_exit(self, slot, now):
+        self.exit_time[slot] = now
+        self.ready_since[slot] = -1
+        self.turnaround_hist.record(now - self.arrival[slot])
+        self.finished += 1
+        self.finished_wait += self.wait_time[slot]
+        self.finished_run += self.run_time[slot]
+        self.finished_switches += self.switches[slot]
+        self.add_group_usage(self.finished_groups, self.groups[slot], self.run_time[slot])
+        rate = self.rate(slot, now)
+        if rate is not None:
+            rates = self.finished_rates
+            rates[0] += rate
+            rates[1] += rate * rate
+            rates[2] += 1
+        if self.recycle:
+            self.names[slot] = None
+            self.groups[slot] = None
+            self.free.append(slot)
+
+    def rate(self, slot, end):
+        # The vRuntime the task was charged per second alive, i.e. its
+        # weighted CPU service rate
+        alive = end - self.arrival[slot]
+        return self.vruntime[slot] / alive if alive > 0 else None
+
+    def fairness(self, now):
+        # Jain's index over the service rates of every task, live or exited;
+        # 1.0 means perfectly fair
+        total, squares, count = self.finished_rates
+        for slot in self.live():
+            rate = self.rate(slot, now)
+            if rate is not None:
+                total += rate
+                squares += rate * rate
+                count += 1
+        if squares == 0:
+            return 1.0
+        return total * total / (count * squares)
+
+    def add_group_usage(self, usage, group, run_time):
+        while group:
+            usage[group] = usage.get(group, 0) + run_time
+            group = group.rpartition("/")[0]
+
+    def group_usage(self):
+        # CPU seconds per task group, each group including its subgroups
+        usage = dict(self.finished_groups)
+        for slot in self.live():
+            self.add_group_usage(usage, self.groups[slot], self.run_time[slot])
+        return {group: run_time / NSEC_PER_SEC for group, run_time in sorted(usage.items())}
+
+    def task(self, slot):
+        return {
+            "name": self.names[slot],
+            "wait_time": self.wait_time[slot] / NSEC_PER_SEC,
+            "run_time": self.run_time[slot] / NSEC_PER_SEC,
+            "switches": self.switches[slot],
+            "time_to_first_run": (self.first_run[slot] - self.arrival[slot]) / NSEC_PER_SEC if self.first_run[slot] >= 0 else None,
+        }
+
+    def report(self, now):
+        # Durations in seconds
+        live = list(self.live())
+        report = {
+            "tasks": self.registered,
+            "finished": self.finished,
+            "dispatches": self.finished_switches + sum(self.switches[slot] for slot in live),
+            "fairness": self.fairness(now),
+            "run_time": (self.finished_run + sum(self.run_time[slot] for slot in live)) / NSEC_PER_SEC,
+            "wait_time": (self.finished_wait + sum(self.wait_time[slot] for slot in live)) / NSEC_PER_SEC,
+            "groups": self.group_usage(),
+        }
+        for name, histogram in (("wait", self.wait_hist), ("first_run", self.first_run_hist),
+                                ("slice", self.slice_hist), ("turnaround", self.turnaround_hist)):
+            report[f"{name}_mean"] = histogram.mean() / NSEC_PER_SEC
+            for pct in (50, 90, 99):
+                report[f"{name}_p{pct}"] = histogram.percentile(pct) / NSEC_PER_SEC
+        return report
+
+    def print_report(self, now):
+        report = self.report(now)
+        print(f"Tasks: {report['tasks']} ({report['finished']} finished), "
+              f"dispatches: {report['dispatches']}, fairness: {report['fairness']:.3f}")
+        for name in ("wait", "first_run", "slice", "turnaround"):
+            print(f"  {name:<10} mean {report[f'{name}_mean']:9.3f}s  p50 {report[f'{name}_p50']:9.3f}s  "
+                  f"p99 {report[f'{name}_p99']:9.3f}s")
+        for group, run_time in report["groups"].items():
+            share = run_time / report["run_time"] if report["run_time"] else 0.0
+            print(f"  group {group:<16} {run_time:9.3f}s CPU ({share:.1%})")
@@ -0,0 +1,548 @@
+from collections import OrderedDict
+from itertools import chain
+from run_queue import RunQueue
+from task import SchedTunables
+from weights import NICE_0_LOAD, calc_delta_fair
+
+# Scheduling policies. A policy is the per-CPU run queue itself: Scheduler and
+# Simulation keep one per CPU and drive it through
+#
+#   place(process)            a new task joins (sets its starting vRuntime)
+#   enqueue(process)          the task becomes runnable on this CPU
+#   dequeue(process)          it blocks, exits or migrates away
+#   pick_next()               the task to run next; it stays queued while running
+#   time_slice(process)       how long it may run (ns)
+#   tick(process, delta_exec) charge it for delta_exec ns of CPU at slice end
+#   on_io(process)            it is about to block on I/O
+#   reweight(process, weight) its nice level changed (queued or not)
+#
+# plus len(), `in`, iteration, `load` (total weight), task_load(process), the
+# part of `load` that is the task's, and min_vruntime_for(process), the floor
+# of the timeline the task would join, which the load balancer (smp) uses. Every policy charges vRuntime the CFS way, and
+# tasks exit once their charged service reaches exe_time, so a workload does
+# the same work whichever policy runs it; only the order and length of the
+# turns differ.
+
+
+def charge(process, delta_exec):
+    process["vRuntime"] = process["process_obj"].calculate_vRuntime(process["weight"], delta_exec)
+
+
+# The default: vRuntime-ordered timeline with slices sized from the period.
+class CFS(RunQueue):
+    name = "cfs"
+
+    def __init__(self, tunables=None):
+        super().__init__()
+        self.tunables = tunables or SchedTunables()
+
+    def place(self, process):
+        # New tasks start level with the queue they join
+        process["process_obj"].vRuntime = self.min_vruntime
+        process["vRuntime"] = process["process_obj"].vRuntime
+
+    def time_slice(self, process):
+        # The slice is recomputed from this queue's current load on every pick
+        return self.tunables.time_slice(process["weight"], self.load, len(self))
+
+    def min_vruntime_for(self, process):
+        return self.min_vruntime
+
+    def task_load(self, process):
+        return process["weight"]
+
+    def tick(self, process, delta_exec):
+        charge(process, delta_exec)
+        self.update(process)
+
+    def on_io(self, process):
+        pass
+
+
+# Earliest Eligible Virtual Deadline First, the kernel's successor to CFS.
+# A task is eligible while its vRuntime is at most the queue's weighted average
+# V (it is owed service); among eligible tasks the earliest virtual deadline
+# (vRuntime + base slice scaled by weight) runs. Tasks wait in a vRuntime heap
+# until they become eligible and are then moved to a deadline heap; pick_next
+# moves tasks whichever way V has shifted, so both moves are amortized.
+# Blocking tasks keep their lag (V - vRuntime) and are placed by it on wakeup.
+class EEVDF:
+    name = "eevdf"
+
+    def __init__(self, tunables=None):
+        self.tunables = tunables or SchedTunables()
+        self.base_slice = self.tunables.min_granularity or self.tunables.latency
+        self.eligible = RunQueue(key="deadline")
+        self.waiting = RunQueue()
+        self.load = 0
+        self.weighted_vruntime = 0
+        self.avg = 0
+
+    def __len__(self):
+        return len(self.eligible) + len(self.waiting)
+
+    def __contains__(self, process):
+        return process in self.eligible or process in self.waiting
+
+    def __iter__(self):
+        return chain(self.eligible, self.waiting)
+
+    def min_vruntime_for(self, process):
+        # Migration keeps a task's offset from V, which is what its lag is
+        return self.avg_vruntime()
+
+    def task_load(self, process):
+        return process["weight"]
+
+    def avg_vruntime(self):
+        if self.load:
+            self.avg = self.weighted_vruntime // self.load
+        return self.avg
+
+    def vslice(self, process):
+        return calc_delta_fair(self.base_slice, process["weight"])
+
+    def set_vruntime(self, process, vruntime):
+        process["process_obj"].vRuntime = vruntime
+        process["vRuntime"] = vruntime
+        process["deadline"] = vruntime + self.vslice(process)
+
+    def place(self, process):
+        self.set_vruntime(process, self.avg_vruntime())
+
+    def enqueue(self, process):
+        if process in self:
+            return
+        lag = process.pop("lag", None)
+        if lag is not None:
+            self.set_vruntime(process, self.avg_vruntime() - lag)
+        elif "deadline" not in process or process["deadline"] < process["vRuntime"]:
+            process["deadline"] = process["vRuntime"] + self.vslice(process)
+        self.load += process["weight"]
+        self.weighted_vruntime += process["weight"] * process["vRuntime"]
+        self.waiting.enqueue(process)
+
+    def dequeue(self, process):
+        if not (self.eligible.dequeue(process) or self.waiting.dequeue(process)):
+            return False
+        self.load -= process["weight"]
+        self.weighted_vruntime -= process["weight"] * process["vRuntime"]
+        return True
+
+    def pick_next(self):
+        avg = self.avg_vruntime()
+        while len(self.waiting) and self.waiting.pick_next()["vRuntime"] <= avg:
+            self.eligible.enqueue(self.waiting.pop_next())
+        while len(self.eligible) and self.eligible.pick_next()["vRuntime"] > avg:
+            self.waiting.enqueue(self.eligible.pop_next())
+        if len(self.eligible):
+            return self.eligible.pick_next()
+        return self.waiting.pick_next()
+
+    def time_slice(self, process):
+        return self.base_slice
+
+    def tick(self, process, delta_exec):
+        queued = self.dequeue(process)
+        charge(process, delta_exec)
+        if process["vRuntime"] >= process["deadline"]:
+            process["deadline"] = process["vRuntime"] + self.vslice(process)
+        if queued:
+            self.enqueue(process)
+
+    def reweight(self, process, weight):
+        queued = self.dequeue(process)
+        process["weight"] = weight
+        process["deadline"] = process["vRuntime"] + self.vslice(process)
+        if queued:
+            self.enqueue(process)
+
+    def on_io(self, process):
+        # Lag is clamped so a long sleep neither banks nor owes unbounded service
+        limit = 2 * self.vslice(process)
+        process["lag"] = max(-limit, min(limit, self.avg_vruntime() - process["vRuntime"]))
+
+
+# Plain round-robin: FIFO order, one fixed quantum per turn, weights only
+# matter for load balancing.
+class RoundRobin:
+    name = "rr"
+
+    def __init__(self, tunables=None):
+        self.tunables = tunables or SchedTunables()
+        self.quantum = self.tunables.min_granularity or self.tunables.latency
+        self.queue = OrderedDict()
+        self.load = 0
+
+    def __len__(self):
+        return len(self.queue)
+
+    def __contains__(self, process):
+        return process["name"] in self.queue
+
+    def __iter__(self):
+        return iter(self.queue.values())
+
+    def min_vruntime_for(self, process):
+        return 0
+
+    def task_load(self, process):
+        return process["weight"]
+
+    def place(self, process):
+        process["vRuntime"] = process["process_obj"].vRuntime
+
+    def enqueue(self, process):
+        if process["name"] in self.queue:
+            return
+        self.queue[process["name"]] = process
+        self.load += process["weight"]
+
+    def dequeue(self, process):
+        if self.queue.pop(process["name"], None) is None:
+            return False
+        self.load -= process["weight"]
+        return True
+
+    def pick_next(self):
+        return next(iter(self.queue.values()), None)
+
+    def time_slice(self, process):
+        return self.quantum
+
+    def tick(self, process, delta_exec):
+        charge(process, delta_exec)
+        if process["name"] in self.queue:
+            self.queue.move_to_end(process["name"])
+
+    def reweight(self, process, weight):
+        if process in self:
+            self.load += weight - process["weight"]
+        process["weight"] = weight
+
+    def on_io(self, process):
+        pass
+
+
+# Multi-level feedback queue: new tasks start at the top level, each level is
+# round-robin with a quantum twice the one above, and a task that has used up
+# its allotment at a level (over any number of turns, so giving up the CPU
+# early does not reset it) moves down one. Every boost_period of CPU time all
+# tasks go back to the top so long-running ones are not starved.
+class MLFQ:
+    name = "mlfq"
+
+    def __init__(self, tunables=None, levels=3):
+        self.tunables = tunables or SchedTunables()
+        base = self.tunables.min_granularity or self.tunables.latency
+        self.quanta = [base << level for level in range(levels)]
+        self.levels = [OrderedDict() for _ in range(levels)]
+        self.boost_period = 4 * self.tunables.latency
+        self.elapsed = 0
+        self.count = 0
+        self.load = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, process):
+        return process["name"] in self.levels[process.get("level", 0)]
+
+    def __iter__(self):
+        return chain.from_iterable(level.values() for level in self.levels)
+
+    def min_vruntime_for(self, process):
+        return 0
+
+    def task_load(self, process):
+        return process["weight"]
+
+    def place(self, process):
+        process["vRuntime"] = process["process_obj"].vRuntime
+        process["level"] = 0
+        process["used"] = 0
+
+    def enqueue(self, process):
+        if process in self:
+            return
+        # Tasks migrating in keep their level
+        self.levels[process.setdefault("level", 0)][process["name"]] = process
+        process.setdefault("used", 0)
+        self.count += 1
+        self.load += process["weight"]
+
+    def dequeue(self, process):
+        if self.levels[process.get("level", 0)].pop(process["name"], None) is None:
+            return False
+        self.count -= 1
+        self.load -= process["weight"]
+        return True
+
+    def pick_next(self):
+        for level in self.levels:
+            if level:
+                return next(iter(level.values()))
+        return None
+
+    def time_slice(self, process):
+        return self.quanta[process["level"]] - process["used"]
+
+    def tick(self, process, delta_exec):
+        charge(process, delta_exec)
+        queued = self.dequeue(process)
+        process["used"] += delta_exec
+        if process["used"] >= self.quanta[process["level"]]:
+            process["level"] = min(process["level"] + 1, len(self.levels) - 1)
+            process["used"] = 0
+        if queued:
+            self.enqueue(process)
+        self.elapsed += delta_exec
+        if self.elapsed >= self.boost_period:
+            self.boost()
+
+    def reweight(self, process, weight):
+        if process in self:
+            self.load += weight - process["weight"]
+        process["weight"] = weight
+
+    def boost(self):
+        self.elapsed = 0
+        for process in list(self):
+            self.dequeue(process)
+            process["level"] = 0
+            process["used"] = 0
+            self.enqueue(process)
+
+    def on_io(self, process):
+        pass
+
+
+# Task groups and their shares, like cgroup cpu.weight. Groups are paths
+# ("tenant", "tenant/web"); a task in "tenant/web" competes inside web, web
+# competes with its siblings inside tenant, and tenant with the other top
+# level groups and ungrouped tasks. Parents are created on demand.
+class TaskGroups:
+    def __init__(self, shares=None):
+        self.shares = {}
+        for path, weight in (shares or {}).items():
+            self.add(path, weight)
+
+    @classmethod
+    def parse(cls, spec):
+        # "a=2048,a/web=512,b": shares default to NICE_0_LOAD
+        groups = cls()
+        for item in spec.split(","):
+            path, _, weight = item.strip().partition("=")
+            try:
+                groups.add(path, int(weight) if weight else NICE_0_LOAD)
+            except ValueError:
+                raise ValueError(f"Invalid group '{item}'")
+        return groups
+
+    def add(self, path, weight=NICE_0_LOAD):
+        path = path.strip("/")
+        if not path or weight <= 0:
+            raise ValueError(f"Invalid group '{path}'")
+        self.shares[path] = weight
+        parent = self.parent(path)
+        if parent is not None and parent not in self.shares:
+            self.add(parent)
+
+    def parent(self, path):
+        parent, _, _ = path.rpartition("/")
+        return parent or None
+
+    def leaves(self):
+        parents = {self.parent(path) for path in self.shares}
+        return [path for path in self.shares if path not in parents]
+
+    def assign(self, count):
+        # Spread tasks round-robin over the leaf groups
+        leaves = self.leaves()
+        return [leaves[i % len(leaves)] for i in range(count)]
+
+
+# Floor of a group entity's weight, however little of the group is on its CPU
+MIN_SHARES = 2
+
+
+# Hierarchical CFS. Every group has one scheduling entity per CPU, a dict that
+# sits in its parent's RunQueue like a task and carries the group's own
+# RunQueue. A group entity is queued only while the group has runnable tasks,
+# so enqueue/dequeue/tick walk one path of the tree and pick_next descends it:
+# O(depth * log n). Tasks without a group sit in the root queue.
+#
+# `peers` are the GroupCFS of every CPU, this one included. A group's shares
+# are split between its entities on those CPUs in proportion to its runnable
+# weight on each, like the kernel's calc_group_shares(), and `load` is the
+# root queue's, so the balancer sees what each CPU's groups are entitled to
+# and spreads a group's tasks instead of giving every CPU its full shares.
+class GroupCFS:
+    name = "cfs"
+
+    def __init__(self, tunables=None, groups=None, peers=None):
+        self.tunables = tunables or SchedTunables()
+        self.groups = groups or TaskGroups()
+        self.peers = peers if peers is not None else [self]
+        self.root = RunQueue()
+        self.entities = {}
+        self.count = 0
+
+    @property
+    def load(self):
+        return self.root.load
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, process):
+        return process in self.queue_of(process.get("group"))
+
+    def __iter__(self):
+        return self.tasks(self.root)
+
+    def tasks(self, queue):
+        for entry in queue:
+            if "queue" in entry:
+                yield from self.tasks(entry["queue"])
+            else:
+                yield entry
+
+    def entity(self, path):
+        entity = self.entities.get(path)
+        if entity is None:
+            if path not in self.groups.shares:
+                raise ValueError(f"Unknown task group '{path}'")
+            entity = self.entities[path] = {
+                "name": "/" + path,
+                "group": self.groups.parent(path),
+                "weight": self.groups.shares[path],
+                "vRuntime": 0,
+                "queue": RunQueue(),
+            }
+        return entity
+
+    def queue_of(self, path):
+        return self.root if path is None else self.entity(path)["queue"]
+
+    def min_vruntime_for(self, process):
+        return self.queue_of(process.get("group")).min_vruntime
+
+    def task_load(self, process):
+        # The task's weight as a fraction of each group's entity, up to the root
+        load, path = process["weight"], process.get("group")
+        while path is not None:
+            entity = self.entity(path)
+            load = load * entity["weight"] // max(self.queue_of(path).load, 1)
+            path = entity["group"]
+        return load
+
+    def update_shares(self, path):
+        # The runnable weight of `path` changed on this CPU: resplit its
+        # shares, then its ancestors', over every CPU
+        while path is not None:
+            shares = self.groups.shares[path]
+            loads = [peer.queue_of(path).load for peer in self.peers]
+            total = sum(loads)
+            for peer, load in zip(self.peers, loads):
+                entity = peer.entity(path)
+                weight = max(MIN_SHARES, shares * load // total) if total else shares
+                if weight != entity["weight"]:
+                    peer.queue_of(entity["group"]).reweight(entity, weight)
+            path = self.groups.parent(path)
+
+    def place(self, process):
+        # New tasks start level with their group's timeline
+        process["process_obj"].vRuntime = self.min_vruntime_for(process)
+        process["vRuntime"] = process["process_obj"].vRuntime
+
+    def enqueue(self, process):
+        path = process.get("group")
+        queue = self.queue_of(path)
+        if process in queue:
+            return
+        queue.enqueue(process)
+        self.count += 1
+        # Activate the group entities that just got their first runnable task
+        group = path
+        while path is not None:
+            entity = self.entity(path)
+            parent = self.queue_of(entity["group"])
+            if entity in parent:
+                break
+            entity["vRuntime"] = max(entity["vRuntime"], parent.min_vruntime)
+            parent.enqueue(entity)
+            path = entity["group"]
+        self.update_shares(group)
+
+    def dequeue(self, process):
+        path = process.get("group")
+        queue = self.queue_of(path)
+        if not queue.dequeue(process):
+            return False
+        self.count -= 1
+        group = path
+        while path is not None and len(queue) == 0:
+            entity = self.entity(path)
+            queue = self.queue_of(entity["group"])
+            queue.dequeue(entity)
+            path = entity["group"]
+        self.update_shares(group)
+        return True
+
+    def pick_next(self):
+        entry = self.root.pick_next()
+        while entry is not None and "queue" in entry:
+            entry = entry["queue"].pick_next()
+        return entry
+
+    def time_slice(self, process):
+        # The period is split by weight at every level, like sched_slice()
+        share = self.tunables.period(self.count)
+        entry, path = process, process.get("group")
+        while True:
+            queue = self.queue_of(path)
+            share = share * entry["weight"] // max(queue.load, entry["weight"])
+            if path is None:
+                return share
+            entry = self.entity(path)
+            path = entry["group"]
+
+    def tick(self, process, delta_exec):
+        charge(process, delta_exec)
+        path = process.get("group")
+        self.queue_of(path).update(process)
+        while path is not None:
+            entity = self.entity(path)
+            entity["vRuntime"] += calc_delta_fair(delta_exec, entity["weight"])
+            self.queue_of(entity["group"]).update(entity)
+            path = entity["group"]
+
+    def reweight(self, process, weight):
+        self.queue_of(process.get("group")).reweight(process, weight)
+        self.update_shares(process.get("group"))
+
+    def on_io(self, process):
+        pass
+
+
+POLICIES = {policy.name: policy for policy in (CFS, EEVDF, RoundRobin, MLFQ)}
+
+
+def make_run_queue(policy="cfs", tunables=None, groups=None):
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown scheduling policy '{policy}', expected one of {', '.join(POLICIES)}")
+    if groups is not None:
+        if policy != "cfs":
+            raise ValueError("Task groups are only supported with the cfs policy")
+        return GroupCFS(tunables, groups)
+    return POLICIES[policy](tunables)
+
+
+def make_run_queues(count, policy="cfs", tunables=None, groups=None):
+    # One run queue per CPU; grouped queues share their groups' shares
+    run_queues = [make_run_queue(policy, tunables, groups) for _ in range(count)]
+    if groups is not None:
+        for run_queue in run_queues:
+            run_queue.peers = run_queues
+    return run_queues
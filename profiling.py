@@ -0,0 +1,124 @@
+import functools
+import os
+import sys
+import time
+from metrics import Histogram
+
+# Opt-in timers around the scheduler hot paths. enable() swaps each hooked
+# method on its class for a timing wrapper and disable() puts the original
+# back, so nothing is measured (or costs anything) unless profiling is on.
+# Times are inclusive: a hook that calls another hooked method counts both.
+# Only modules already imported are hooked (profiling never pulls in the
+# window code), so enable it once the modules of interest are loaded.
+# Updates are not locked, so with several CPU threads a few samples can be
+# lost; the numbers are for finding where time goes, not for accounting.
+HOT_PATHS = [
+    "run_queue.RunQueue.pick_next",
+    "run_queue.RunQueue.enqueue",
+    "run_queue.RunQueue.dequeue",
+    "policies.CFS.tick",
+    "policies.EEVDF.pick_next",
+    "policies.EEVDF.tick",
+    "policies.GroupCFS.pick_next",
+    "policies.GroupCFS.tick",
+    "task.TaskAccount.calculate_vRuntime",
+    "smp.select_cpu",
+    "events.EventChannel.put",
+    "events.EventChannel.drain",
+    "simulation.Simulation.dispatch",
+    "simulation.Simulation.handle_slice_end",
+    "simulation.Simulation.handle_io",
+    "simulation.Simulation.handle_io_completion",
+    "scheduler.Scheduler.pick_next",
+    "scheduler.Scheduler.handle_io",
+    "scheduler.Scheduler.handle_io_completion",
+    "visualization.Scene.update",
+]
+
+
+def resolve(path):
+    # "module.Class.method" or "module.function" -> (owner, attribute), None
+    # if the module isn't loaded
+    module_name, *owners, attribute = path.split(".")
+    owner = sys.modules.get(module_name)
+    script = sys.modules["__main__"]
+    if owner is None and os.path.splitext(os.path.basename(getattr(script, "__file__", "") or ""))[0] == module_name:
+        # Run as a script the module is __main__
+        owner = script
+    if owner is None:
+        return None
+    for name in owners:
+        owner = getattr(owner, name)
+    return owner, attribute
+
+
+class Profiler:
+    def __init__(self, paths=None):
+        self.paths = HOT_PATHS if paths is None else paths
+        self.timers = {}
+        self.patched = []
+
+    def enable(self):
+        if self.patched:
+            return self
+        for path in self.paths:
+            target = resolve(path)
+            if target is None:
+                continue
+            owner, attribute = target
+            original = owner.__dict__.get(attribute)
+            setattr(owner, attribute, self.wrap(path, getattr(owner, attribute)))
+            self.patched.append((owner, attribute, original))
+        return self
+
+    def disable(self):
+        for owner, attribute, original in reversed(self.patched):
+            if original is None:
+                delattr(owner, attribute)
+            else:
+                setattr(owner, attribute, original)
+        self.patched = []
+
+    def reset(self):
+        for histogram in self.timers.values():
+            histogram.__init__()
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    def wrap(self, path, func):
+        histogram = self.timers.setdefault(path, Histogram())
+        clock = time.perf_counter_ns
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.record(clock() - start)
+        return timed
+
+    def report(self):
+        # path -> calls, total/mean/p50/p99/max in ns, busiest first
+        rows = {}
+        for path, histogram in sorted(self.timers.items(), key=lambda item: -item[1].sum):
+            if histogram.total:
+                rows[path] = {
+                    "calls": histogram.total,
+                    "total": histogram.sum,
+                    "mean": histogram.mean(),
+                    "p50": histogram.percentile(50),
+                    "p99": histogram.percentile(99),
+                    "max": histogram.max,
+                }
+        return rows
+
+    def print_report(self):
+        print(f"{'hot path':<42} {'calls':>10} {'total ms':>10} {'mean us':>9} {'p50 us':>8} {'p99 us':>8}")
+        for path, row in self.report().items():
+            print(f"{path:<42} {row['calls']:>10} {row['total'] / 1e6:>10.2f} {row['mean'] / 1e3:>9.2f} "
+                  f"{row['p50'] / 1e3:>8.2f} {row['p99'] / 1e3:>8.2f}")
@@ -0,0 +1,119 @@
+# vRuntime ordered run queue (the CFS timeline). An indexed binary min-heap:
+# the leftmost task is picked in O(1), enqueue/dequeue/re-keying are O(log n).
+# Entries are the scheduler's process dicts, indexed by name. `key` names the
+# process field the heap is ordered on.
+class RunQueue:
+    def __init__(self, key="vRuntime"):
+        self.key = key
+        self.heap = []
+        self.index = {}
+        self.load = 0
+        self.min_vruntime = 0
+        self.seq = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, process):
+        return process["name"] in self.index
+
+    def __iter__(self):
+        return (entry[2] for entry in self.heap)
+
+    def enqueue(self, process):
+        if process["name"] in self.index:
+            return
+        # The sequence number keeps ties in FIFO order, like the stable sort did
+        self.seq += 1
+        entry = [process[self.key], self.seq, process]
+        self.heap.append(entry)
+        self.index[process["name"]] = len(self.heap) - 1
+        self.load += process["weight"]
+        self._sift_up(len(self.heap) - 1)
+        self._update_min_vruntime()
+
+    def dequeue(self, process):
+        pos = self.index.pop(process["name"], None)
+        if pos is None:
+            return False
+        self.load -= process["weight"]
+        last = self.heap.pop()
+        if pos < len(self.heap):
+            self.heap[pos] = last
+            self.index[last[2]["name"]] = pos
+            self._sift(pos)
+        self._update_min_vruntime()
+        return True
+
+    def pick_next(self):
+        if not self.heap:
+            return None
+        return self.heap[0][2]
+
+    def pop_next(self):
+        process = self.pick_next()
+        if process is not None:
+            self.dequeue(process)
+        return process
+
+    def update(self, process):
+        # Re-key a queued task after its vRuntime changed
+        pos = self.index.get(process["name"])
+        if pos is None:
+            return
+        self.heap[pos][0] = process[self.key]
+        self._sift(pos)
+        self._update_min_vruntime()
+
+    def reweight(self, process, weight):
+        if process["name"] in self.index:
+            self.load += weight - process["weight"]
+        process["weight"] = weight
+
+    def _update_min_vruntime(self):
+        # min_vruntime only ever moves forward, as in the kernel
+        if self.heap and self.heap[0][0] > self.min_vruntime:
+            self.min_vruntime = self.heap[0][0]
+
+    def _sift(self, pos):
+        if pos > 0 and _less(self.heap[pos], self.heap[(pos - 1) // 2]):
+            self._sift_up(pos)
+        else:
+            self._sift_down(pos)
+
+    def _sift_up(self, pos):
+        heap = self.heap
+        entry = heap[pos]
+        while pos > 0:
+            parent = (pos - 1) // 2
+            if _less(entry, heap[parent]):
+                heap[pos] = heap[parent]
+                self.index[heap[pos][2]["name"]] = pos
+                pos = parent
+            else:
+                break
+        heap[pos] = entry
+        self.index[entry[2]["name"]] = pos
+
+    def _sift_down(self, pos):
+        heap = self.heap
+        size = len(heap)
+        entry = heap[pos]
+        while True:
+            child = 2 * pos + 1
+            if child >= size:
+                break
+            if child + 1 < size and _less(heap[child + 1], heap[child]):
+                child += 1
+            if _less(heap[child], entry):
+                heap[pos] = heap[child]
+                self.index[heap[pos][2]["name"]] = pos
+                pos = child
+            else:
+                break
+        heap[pos] = entry
+        self.index[entry[2]["name"]] = pos
+
+
+def _less(a, b):
+    return a[0] < b[0] or (a[0] == b[0] and a[1] < b[1])
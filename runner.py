@@ -0,0 +1,143 @@
+import argparse
+import csv
+import importlib.util
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from simulation import Simulation
+from task import SchedTunables
+from weights import NSEC_PER_SEC
+from workload import (DEFAULT_CPU_BURST, DEFAULT_EXE_TIME, DEFAULT_INTERARRIVAL, DEFAULT_IO_BURST, DEFAULT_NICE,
+                      Workload)
+
+# Headless batch runner: sweeps workloads over task counts, CPU counts and
+# seeds, runs every combination as a Simulation in a process pool and writes
+# one row of aggregate metrics per run.
+#
+#   python runner.py --tasks 100,1000 --cpus 1,4 --seeds 5 --out results.csv
+
+
+def summarize(sim, sim_time):
+    report = sim.metrics.report(sim.clock)
+    row = {
+        "sim_time": sim_time,
+        "finished": report["finished"],
+        "throughput": report["finished"] / sim_time if sim_time else 0.0,
+        "fairness": report["fairness"],
+        "dispatches": sim.dispatches,
+        "context_switches": sim.context_switches,
+        "migrations": sim.migrations,
+    }
+    for name in ("wait", "first_run", "turnaround"):
+        for stat in ("mean", "p50", "p90", "p99"):
+            row[f"{name}_{stat}"] = report[f"{name}_{stat}"]
+    return row
+
+
+def run_one(job):
+    workload = Workload(**job["workload"])
+    tunables = SchedTunables(int(job["latency"] * NSEC_PER_SEC), int(job["min_granularity"] * NSEC_PER_SEC))
+    sim = Simulation(seed=job["seed"], num_cpus=job["cpus"], tunables=tunables, workload=workload)
+    started = time.perf_counter()
+    sim_time = sim.run_workload(until=job["until"])
+    row = dict(workload.describe())
+    row.update({"cpus": job["cpus"], "seed": job["seed"]})
+    row.update(summarize(sim, sim_time))
+    row["wall_time"] = time.perf_counter() - started
+    return row
+
+
+def check_output(path):
+    # Called before the sweep starts, so a missing dependency doesn't throw
+    # away finished runs
+    if path.endswith(".parquet") and not all(importlib.util.find_spec(name) for name in ("pandas", "pyarrow")):
+        raise SystemExit("Writing Parquet needs pandas and pyarrow installed; use a .csv output instead")
+
+
+def write_results(rows, path):
+    if path.endswith(".parquet"):
+        import pandas
+        pandas.DataFrame(rows).to_parquet(path, index=False)
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_table(rows):
+    columns = ["tasks", "cpus", "seed", "sim_time", "throughput", "wait_p50", "wait_p99", "turnaround_p99",
+               "fairness", "context_switches", "wall_time"]
+    print(" ".join(f"{column:>16}" for column in columns))
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row[column]
+            cells.append(f"{value:>16.3f}" if isinstance(value, float) else f"{value:>16}")
+        print(" ".join(cells))
+
+
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {text}")
+    return value
+
+
+def int_list(text):
+    return [positive_int(value) for value in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep simulated CFS workloads and collect metrics")
+    parser.add_argument("--tasks", type=int_list, default=[100], help="comma separated task counts")
+    parser.add_argument("--cpus", type=int_list, default=[1], help="comma separated CPU counts")
+    parser.add_argument("--seeds", type=positive_int, default=1, help="runs per combination")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--nice", default=DEFAULT_NICE)
+    parser.add_argument("--cpu-burst", default=DEFAULT_CPU_BURST)
+    parser.add_argument("--io-burst", default=DEFAULT_IO_BURST)
+    parser.add_argument("--exe-time", default=DEFAULT_EXE_TIME)
+    parser.add_argument("--interarrival", default=DEFAULT_INTERARRIVAL)
+    parser.add_argument("--latency", type=float, default=10.0, help="scheduling latency target in seconds")
+    parser.add_argument("--min-granularity", type=float, default=1.25, help="minimum slice in seconds")
+    parser.add_argument("--until", type=float, default=None, help="stop each run after this many simulated seconds")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default="results.csv", help="output .csv or .parquet file")
+    args = parser.parse_args(argv)
+    check_output(args.out)
+
+    jobs = []
+    for tasks, cpus, i in itertools.product(args.tasks, args.cpus, range(args.seeds)):
+        jobs.append({
+            "workload": {
+                "tasks": tasks,
+                "nice": args.nice,
+                "cpu_burst": args.cpu_burst,
+                "io_burst": args.io_burst,
+                "exe_time": args.exe_time,
+                "interarrival": args.interarrival,
+            },
+            "cpus": cpus,
+            "seed": args.seed + i,
+            "latency": args.latency,
+            "min_granularity": args.min_granularity,
+            "until": args.until,
+        })
+    # Validate the distributions before fanning out
+    try:
+        Workload(**jobs[0]["workload"])
+    except ValueError as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        rows = list(pool.map(run_one, jobs))
+    print_table(rows)
+    write_results(rows, args.out)
+    print(f"{len(rows)} runs in {time.perf_counter() - started:.2f}s, results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+import queue
+import random
+import threading
+from collections import deque
+import time
+from policies import make_run_queues
+from task import SchedTunables, TaskAccount
+from weights import NSEC_PER_SEC, nice_to_weight
+from backends import ProcessBackend, make_backend
+from task_table import IO_WAIT, RUNNABLE
+from wait_queue import WaitQueue
+import smp
+from metrics import Metrics
+import tracing
+
+# The real-time scheduling engine: tasks are workers (processes, threads or
+# generators, see backends) paused and resumed by per-CPU scheduler threads.
+# Nothing here needs a display, so workers and embedding tools import only
+# this; the window lives in visualization and loads only when one is opened.
+
+class ProcessCreate(TaskAccount):
+    def __init__(self, table, slot, backend=None):
+        super().__init__()
+        backend = backend or ProcessBackend()
+        # Set while the task holds a CPU (or is being shut down); a paused
+        # worker blocks on it rather than polling
+        self.resume_event = backend.make_event()
+        self.shutdown_flag = backend.make_event()
+        self.table = table
+        self.slot = slot
+
+    def steps(self):
+        # Yields how long to sleep before the next step, or the event to wait
+        # for while paused, so the same behaviour can run in a thread or
+        # process (worker) or on a shared driver thread
+        table, slot = self.table, self.slot
+        while not self.shutdown_flag.is_set():
+            if table.state[slot] == IO_WAIT:
+                yield table.io_duration[slot]
+                if self.shutdown_flag.is_set():
+                    # The slot may already belong to another task
+                    return
+                table.state[slot] = RUNNABLE
+            elif not self.resume_event.is_set():
+                yield self.resume_event
+            else:
+                if random.random() < 0.3:  # Increased I/O chance
+                    duration = random.uniform(2, 4)
+                    table.io_duration[slot] = duration
+                    table.io_deadline[slot] = time.time() + 0.5 + duration
+                    table.state[slot] = IO_WAIT
+                yield 0.5  # Reduced sleep time
+
+    def worker(self):
+        try:
+            for step in self.steps():
+                if step is self.resume_event:
+                    step.wait()
+                else:
+                    time.sleep(step)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+class Scheduler:
+    def __init__(self, notify_queue, backend="process", num_cpus=1, balance_interval=4, tunables=None, seed=None,
+                 trace_path=None, policy="cfs", groups=None):
+        self.backend = make_backend(backend)
+        self.num_cpus = num_cpus
+        self.balance_interval = balance_interval
+        self.process_list = []
+        self.tunables = tunables or SchedTunables()
+        self.policy = policy
+        self.groups = groups
+        self.run_queues = make_run_queues(num_cpus, policy, self.tunables, groups)
+        self.current = [None] * num_cpus
+        self.last_run = [None] * num_cpus
+        self.running = set()
+        self.context_switches = 0
+        self.metrics = Metrics()
+        self.notify_queue = notify_queue
+        self.terminated_processes = set()
+        self.io_queue = WaitQueue()
+        self.lock = threading.RLock()
+        self.wakeup = threading.Condition(self.lock)
+        # Events are queued here under the lock and handed to notify_queue by
+        # flush() after it is released, so a full channel never stalls the
+        # scheduler (or deadlocks a consumer that calls submit/kill itself)
+        self.outbox = deque()
+        self.publishing = threading.Lock()
+        self.table = None
+        # Exit times are drawn from a seedable generator; I/O still depends on
+        # the workers, so record a trace (trace_path) to reproduce a run exactly
+        self.rng = random.Random(seed)
+        self.trace_path = trace_path
+        self.trace = None
+        # Live tasks by name. With open_system the CPUs idle instead of
+        # returning when they run dry, until shutdown() is called. An open
+        # system keeps nothing of a task once it exits (its table and Metrics
+        # slots are reused and its name is free again), so tasks can keep
+        # arriving for as long as no more than `capacity` are alive at once.
+        self.tasks = {}
+        self.open_system = False
+        self.keep_finished = True
+
+    def make_process(self, name, nice, affinity=None, group=None):
+        p = ProcessCreate(self.table, self.table.allocate(), self.backend)
+        p.weight_calculate(nice)
+        self.table.weight[p.slot] = p.weight
+        print(f"Adding process {name}")
+        process = {
+            "name": name,
+            "process": None,
+            "process_obj": p,
+            "weight": p.weight,
+            "resume_event": p.resume_event,
+            "exe_time": self.rng.randint(5, 15) * NSEC_PER_SEC,
+            "affinity": affinity,
+            "group": group,
+            "cpu": None,
+            "terminated": False
+        }
+        self.tasks[name] = process
+        return process
+
+    def add_processes(self, process_names=[], weights=[], affinities=None, groups=None):
+        for i in range(len(process_names)):
+            self.process_list.append(self.make_process(process_names[i], weights[i],
+                                                       None if affinities is None else affinities[i],
+                                                       None if groups is None else groups[i]))
+
+    def submit(self, name, nice=0, affinity=None, group=None):
+        # Start a new task while the scheduler runs. It joins at its run
+        # queue's min_vruntime and the Scene gets a "new" message for its cube.
+        with self.lock:
+            if self.table is None:
+                raise RuntimeError("The scheduler is not running")
+            self.check_task(name, affinity, group)
+            process = self.make_process(name, nice, affinity, group)
+            self.publish({"name": name, "status": "new"})
+            self.enqueue(process)
+            process["process"] = self.backend.start(process["process_obj"])
+        self.flush(block=False)
+        return process
+
+    def check_task(self, name, affinity, group):
+        # Everything submit() can reject, checked before anything changes
+        if name in self.tasks or name in self.terminated_processes:
+            raise ValueError(f"Task name {name} is already taken")
+        smp.check_affinity(name, affinity, self.num_cpus)
+        if group is not None and (self.groups is None or group not in self.groups.shares):
+            raise ValueError(f"Unknown task group '{group}'")
+
+    def kill(self, name):
+        with self.lock:
+            process = self.tasks.get(name)
+            if process is None:
+                raise ValueError(f"No live task named {name}")
+            if name in self.running:
+                # Its CPU retires it at the end of the current slice
+                process["killed"] = True
+                return
+            self.retire(process)
+        self.flush(block=False)
+
+    def retire(self, process):
+        # Must hold self.lock; the task is not on a CPU
+        self.io_queue.remove(process)
+        self.run_queues[process["cpu"]].dequeue(process)
+        self.exit(process, process["cpu"])
+
+    def renice(self, name, nice):
+        with self.lock:
+            process = self.tasks.get(name)
+            if process is None:
+                raise ValueError(f"No live task named {name}")
+            weight = nice_to_weight(nice)
+            self.run_queues[process["cpu"]].reweight(process, weight)
+            process["process_obj"].weight = weight
+            self.table.weight[process["process_obj"].slot] = weight
+
+    def shutdown(self):
+        # Let an open system wind down: CPUs return once the remaining tasks are done
+        with self.lock:
+            self.open_system = False
+            self.wakeup.notify_all()
+
+    def stop(self):
+        # Close down for good (the window was closed, say): every live task is
+        # killed and its worker stopped at once, and the CPUs return as soon as
+        # the slices in progress end
+        with self.lock:
+            self.open_system = False
+            for process in list(self.tasks.values()):
+                if process["name"] in self.running:
+                    process["killed"] = True
+                    self.stop_worker(process)
+                else:
+                    self.retire(process)
+            self.wakeup.notify_all()
+        self.flush(block=False)
+
+    def publish(self, message):
+        # Must hold self.lock
+        self.outbox.append(message)
+
+    def flush(self, block=True):
+        # Called without self.lock. Only one thread delivers at a time, which
+        # keeps the order; with block=False whatever doesn't fit is left for
+        # the CPU threads (or the consumer, see Scene.update) to deliver.
+        if not self.publishing.acquire(blocking=block):
+            return
+        try:
+            while self.outbox:
+                try:
+                    if self.notify_queue.put(self.outbox[0], block) is False:
+                        return
+                except queue.Full:
+                    return
+                self.outbox.popleft()
+        finally:
+            self.publishing.release()
+
+    def stop_worker(self, process):
+        try:
+            process["process_obj"].shutdown_flag.set()
+            process["resume_event"].set()
+            self.backend.stop(process["process"])
+        except Exception as e:
+            print(f"Error terminating process {process['name']}: {e}")
+
+    def exit(self, process, cpu):
+        self.stop_worker(process)
+        self.metrics.on_exit(process["slot"], time.monotonic_ns())
+        self.record(tracing.EXIT, process, cpu)
+        self.forget(process)
+        self.publish({"name": process["name"], "status": "terminated"})
+        print(f"Process {process['name']} terminated.")
+
+    def forget(self, process):
+        process["terminated"] = True
+        self.tasks.pop(process["name"], None)
+        if self.table is not None:
+            self.table.release(process["process_obj"].slot)
+        if self.keep_finished:
+            self.terminated_processes.add(process["name"])
+
+    def run_scheduler(self, process_names=[], weights=[], affinities=None, groups=None, open_system=False,
+                      capacity=None):
+        # capacity: task table slots, at least one per initial task; tasks
+        # submitted later need the headroom
+        self.process_list = []
+        self.tasks = {}
+        self.open_system = open_system
+        self.keep_finished = not open_system
+        self.run_queues = make_run_queues(self.num_cpus, self.policy, self.tunables, self.groups)
+        self.current = [None] * self.num_cpus
+        self.last_run = [None] * self.num_cpus
+        self.running = set()
+        self.context_switches = 0
+        self.metrics = Metrics(len(process_names), recycle=open_system)
+        self.io_queue = WaitQueue()
+        self.table = self.backend.make_table(max(len(process_names), capacity or 0))
+        if self.trace_path is not None:
+            self.trace = tracing.TraceWriter(self.trace_path)
+        if groups is None and self.groups is not None:
+            groups = self.groups.assign(len(process_names))
+        self.add_processes(process_names, weights, affinities, groups)
+
+        with self.lock:
+            for process in self.process_list:
+                self.enqueue(process)
+
+        for process in self.process_list:
+            process["process"] = self.backend.start(process["process_obj"])
+
+        # CPU 0 runs on the calling thread, every other CPU on its own thread,
+        # so slices on different CPUs overlap in time
+        cpu_threads = [threading.Thread(target=self.run_cpu, args=(cpu,), daemon=True) for cpu in range(1, self.num_cpus)]
+        for thread in cpu_threads:
+            thread.start()
+        self.run_cpu(0)
+        for thread in cpu_threads:
+            thread.join()
+        self.flush()
+
+        self.table.close()
+        self.table = None
+        if self.trace is not None:
+            self.trace.close()
+            print(f"Trace written to {self.trace_path}")
+        print(f"Scheduler finished after {self.context_switches} context switches")
+        self.metrics.print_report(time.monotonic_ns())
+
+    def report(self):
+        # Metrics snapshot, safe to call while the scheduler is running
+        with self.lock:
+            return self.metrics.report(time.monotonic_ns())
+
+    def record(self, event, process, cpu=0, value=0):
+        if self.trace is not None:
+            self.trace.write(time.monotonic_ns(), process["trace_id"], event, process["vRuntime"], value, cpu)
+
+    def has_work(self):
+        return len(self.io_queue) > 0 or any(len(run_queue) > 0 for run_queue in self.run_queues)
+
+    def enqueue(self, process):
+        cpu = smp.select_cpu(self.run_queues, process)
+        if process["cpu"] is None:
+            process["slot"] = self.metrics.register(process["name"], time.monotonic_ns(), process["group"])
+            if self.trace is not None:
+                # Metrics slots are reused in an open system, trace ids never are
+                process["trace_id"] = self.metrics.registered - 1
+                self.trace.register(process["trace_id"], process["name"], time.monotonic_ns())
+            self.run_queues[cpu].place(process)
+        elif process["cpu"] != cpu:
+            smp.move_vruntime(process, self.run_queues, process["cpu"], cpu)
+        process["cpu"] = cpu
+        self.run_queues[cpu].enqueue(process)
+        self.table.vruntime[process["process_obj"].slot] = process["vRuntime"]
+        self.wakeup.notify_all()
+
+    def balance(self, cpu, idle):
+        if self.num_cpus == 1:
+            return
+        if idle:
+            migrated = smp.idle_balance(self.run_queues, cpu, self.running)
+        else:
+            migrated = smp.load_balance(self.run_queues, cpu, self.running)
+        for process in migrated:
+            self.table.vruntime[process["process_obj"].slot] = process["vRuntime"]
+            print(f"Migrated process {process['name']} to CPU {cpu}")
+
+    def pick_next(self, cpu):
+        run_queue = self.run_queues[cpu]
+        while True:
+            self.handle_io_completion()
+            if len(run_queue) == 0:
+                self.balance(cpu, idle=True)
+            if len(run_queue) == 0:
+                if not self.has_work() and not self.open_system:
+                    return None
+                self.wait_for_io()
+                continue
+
+            process = run_queue.pick_next()
+
+            # If process goes to I/O, continue with the next iteration to pick another process
+            if self.handle_io(process):
+                continue
+
+            if process["terminated"]:
+                run_queue.dequeue(process)
+                continue
+
+            self.current[cpu] = process
+            self.running.add(process["name"])
+            self.metrics.on_run(process["slot"], time.monotonic_ns())
+            process["time_slice"] = run_queue.time_slice(process)
+            if self.last_run[cpu] is not process:
+                self.context_switches += 1
+                self.last_run[cpu] = process
+            return process
+
+    def run_cpu(self, cpu):
+        run_queue = self.run_queues[cpu]
+        slices = 0
+        while True:
+            with self.lock:
+                process = self.pick_next(cpu)
+                if process is None:
+                    self.wakeup.notify_all()
+                    return
+                print(f"Running process: {process['name']} on CPU {cpu} (Time Slice: {process['time_slice'] / NSEC_PER_SEC:.2f}s)")
+                process["resume_event"].set()
+                self.record(tracing.RUNNING, process, cpu, process["time_slice"])
+                self.publish({
+                    "name": process['name'],
+                    "vRuntime": process['vRuntime'] / NSEC_PER_SEC,
+                    "time_slice": process['time_slice'] / NSEC_PER_SEC,
+                    "cpu": cpu,
+                    "status": "running"
+                })
+            self.flush()
+
+            try:
+                time.sleep(process["time_slice"] / NSEC_PER_SEC)
+            finally:
+                process["resume_event"].clear()
+
+            with self.lock:
+                self.current[cpu] = None
+                self.running.discard(process["name"])
+                try:
+                    before = process["vRuntime"]
+                    run_queue.tick(process, process["time_slice"])
+                    self.table.vruntime[process["process_obj"].slot] = process["vRuntime"]
+                    finished = (process["process_obj"].service > process["exe_time"] or process.get("killed")) \
+                        and not process["terminated"]
+                    self.metrics.on_stop(process["slot"], time.monotonic_ns(), process["vRuntime"] - before, runnable=not finished)
+                    self.record(tracing.STOP, process, cpu, process["vRuntime"] - before)
+                    print(f"Process {process['name']} vRuntime: {process['vRuntime'] / NSEC_PER_SEC:.3f}")
+
+                    if finished:
+                        run_queue.dequeue(process)
+                        self.exit(process, cpu)
+                    else:
+                        print(f"Process {process['name']} paused.")
+                except Exception as e:
+                    print(f"Error with process {process['name']}: {e}")
+                    self.record(tracing.EXIT, process, cpu)
+                    self.forget(process)
+                    self.publish({"name": process["name"], "status": "terminated"})
+                    run_queue.dequeue(process)
+                    print(f"Process {process['name']} removed due to error.")
+
+                slices += 1
+                if slices % self.balance_interval == 0:
+                    self.balance(cpu, idle=False)
+                # Let idle CPUs pull the task that just became waitable, or exit
+                self.wakeup.notify_all()
+            self.flush()
+
+    def wake(self):
+        with self.wakeup:
+            self.wakeup.notify_all()
+
+    def wait_for_io(self):
+        # Nothing runnable here: sleep until the next I/O completes, another
+        # CPU queues work, or wake() is called. Must hold self.lock.
+        deadline = self.io_queue.next_deadline()
+        timeout = None if deadline is None else max(0.0, deadline - time.time())
+        self.wakeup.wait(timeout)
+
+    def handle_io_completion(self):
+        for process in self.io_queue.pop_expired(time.time()):
+            slot = process["process_obj"].slot
+            self.table.state[slot] = RUNNABLE
+            process["vRuntime"] = int(self.table.vruntime[slot])
+            self.metrics.on_runnable(process["slot"], time.monotonic_ns())
+            self.enqueue(process)
+            self.record(tracing.IO_COMPLETE, process, process["cpu"])
+            self.publish({"name": process['name'], "status": "io_complete"})
+
+    def handle_io(self, process):
+        slot = process["process_obj"].slot
+        if self.table.state[slot] == IO_WAIT:
+            # Save the current vRuntime before moving to I/O
+            self.table.vruntime[slot] = process["vRuntime"]
+            
+            # Add to I/O queue and remove from run queue
+            self.io_queue.add(process, self.table.io_deadline[slot])
+            self.run_queues[process["cpu"]].on_io(process)
+            self.run_queues[process["cpu"]].dequeue(process)
+            self.metrics.on_block(process["slot"], time.monotonic_ns())
+            self.record(tracing.IO_START, process, process["cpu"], int(self.table.io_duration[slot] * NSEC_PER_SEC))
+            
+            # Notify the visualization about the I/O event
+            self.publish({
+                "name": process['name'],
+                "status": "io_start",
+                "duration": float(self.table.io_duration[slot])
+            })
+            
+            print(f"Process {process['name']} moved to I/O queue for {self.table.io_duration[slot]} seconds")
+            
+            # Return immediately to let the scheduler pick another process
+            return True
+        return False
+
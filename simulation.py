@@ -0,0 +1,438 @@
+import argparse
+import heapq
+import random
+import time
+from policies import POLICIES, TaskGroups, make_run_queues
+from task import SchedTunables, TaskAccount
+from weights import NSEC_PER_SEC, nice_to_weight
+from workload import Workload
+from workload_trace import TraceWorkload, read_trace
+from metrics import Metrics
+from profiling import Profiler
+import smp
+
+# Event kinds, in the order they are handled when they fall on the same instant
+ARRIVAL = 0
+IO_COMPLETE = 1
+SLICE_END = 2
+
+
+# Headless discrete-event version of Scheduler.run_scheduler. Slice expiries,
+# I/O completions and arrivals are events on a simulated clock, so the same CFS
+# decisions are made without ever sleeping. Each simulated CPU has its own run
+# queue and is balanced exactly like the threaded Scheduler. The clock counts
+# integer nanoseconds; run() takes and returns seconds. Task behaviour (CPU
+# and I/O bursts, exit time) comes from a Workload; the default one mirrors
+# ProcessCreate.worker. run_trace() instead replays recorded bursts, and those
+# tasks exit when their trace runs out. Tasks are taken from either source one
+# arrival ahead of the clock, and submit()/kill()/renice() change the task set
+# mid-run (from a notify_queue callback, say), so open systems with sustained
+# arrival rates run without ever rebuilding the scheduler.
+class Simulation:
+    def __init__(self, notify_queue=None, seed=None, verbose=False, num_cpus=1, balance_interval=4, tunables=None,
+                 workload=None, policy="cfs", groups=None, keep_finished=None):
+        self.clock = 0
+        self.events = []
+        self.seq = 0
+        self.num_cpus = num_cpus
+        self.balance_interval = balance_interval
+        self.tunables = tunables or SchedTunables()
+        self.policy = policy
+        self.groups = groups
+        self.leaves = groups.leaves() if groups is not None else []
+        self.group_turn = 0
+        self.run_queues = make_run_queues(num_cpus, policy, self.tunables, groups)
+        self.workload = workload or Workload()
+        self.io_queue = {}
+        self.terminated_processes = set()
+        self.current = [None] * num_cpus
+        self.last_run = [None] * num_cpus
+        self.running = set()
+        self.slices = [0] * num_cpus
+        self.migrations = 0
+        self.notify_queue = notify_queue
+        self.rng = random.Random(seed)
+        self.verbose = verbose
+        self.dispatches = 0
+        self.context_switches = 0
+        self.finish_times = {}
+        # Per-task state of finished tasks (finish_times, terminated_processes
+        # and their Metrics slots) is kept unless keep_finished is False, which
+        # is the default for an open workload: then only aggregates remain
+        # and memory stays bounded however many tasks pass through.
+        if keep_finished is None:
+            keep_finished = self.workload.tasks is not None
+        self.keep_finished = keep_finished
+        self.finished = 0
+        self.metrics = Metrics(recycle=not keep_finished)
+        self.trace = None
+        # Live tasks by name
+        self.tasks = {}
+        self.arrivals = None
+        self.pending_arrival = None
+
+    def schedule(self, when, kind, process):
+        self.seq += 1
+        heapq.heappush(self.events, (when, self.seq, kind, process))
+
+    def notify(self, message):
+        if self.notify_queue is not None:
+            self.notify_queue.put(message)
+
+    def log(self, text):
+        if self.verbose:
+            print(f"[{self.clock / NSEC_PER_SEC:10.3f}] {text}")
+
+    def make_process(self, name, nice, affinity=None, group=None):
+        p = TaskAccount()
+        p.weight_calculate(nice)
+        return {
+            "name": name,
+            "process_obj": p,
+            "weight": p.weight,
+            "exe_time": None,
+            "cpu_left": None,
+            "io_deadline": None,
+            "affinity": affinity,
+            "group": group,
+            "cpu": None,
+            "terminated": False,
+            "exited": False
+        }
+
+    def workload_process(self, name, nice, affinity=None, group=None):
+        process = self.make_process(name, nice, affinity, group)
+        process["exe_time"] = self.workload.exe_time_ns(self.rng)
+        process["cpu_left"] = self.workload.cpu_burst_ns(self.rng)
+        return process
+
+    def add_processes(self, process_names=[], weights=[], arrivals=None, affinities=None, groups=None):
+        for i in range(len(process_names)):
+            process = self.workload_process(process_names[i], weights[i], None if affinities is None else affinities[i],
+                                            self.next_group() if groups is None else groups[i])
+            self.arrive(process, 0 if arrivals is None else int(arrivals[i] * NSEC_PER_SEC))
+
+    def next_group(self):
+        # Tasks not given a group are spread round-robin over the leaf
+        # groups, in arrival order, like Scheduler.run_scheduler does
+        if not self.leaves:
+            return None
+        self.group_turn += 1
+        return self.leaves[(self.group_turn - 1) % len(self.leaves)]
+
+    def arrive(self, process, when):
+        # Returns False if the task joined right away
+        self.tasks[process["name"]] = process
+        if when > self.clock:
+            self.schedule(when, ARRIVAL, process)
+            return True
+        self.admit(process)
+        return False
+
+    def submit(self, name, nice=0, at=None, affinity=None, group=None):
+        # Add a task while the simulation runs (or before), arriving now or at
+        # `at` seconds. It is placed at its queue's min_vruntime like any new task.
+        # Names must be unique, finished tasks included while they are kept.
+        self.check_task(name, affinity, group)
+        process = self.workload_process(name, nice, affinity, group)
+        self.arrive(process, self.clock if at is None else int(at * NSEC_PER_SEC))
+        return process
+
+    def check_task(self, name, affinity, group):
+        # Everything submit() can reject, checked before anything changes
+        if name in self.tasks or name in self.terminated_processes:
+            raise ValueError(f"Task name {name} is already taken")
+        smp.check_affinity(name, affinity, self.num_cpus)
+        if group is not None and (self.groups is None or group not in self.groups.shares):
+            raise ValueError(f"Unknown task group '{group}'")
+
+    def kill(self, name):
+        process = self.tasks.get(name)
+        if process is None:
+            raise ValueError(f"No live task named {name}")
+        if "slot" not in process:
+            # Not arrived yet; the pending ARRIVAL is dropped
+            process["terminated"] = True
+            del self.tasks[name]
+        elif name in self.running:
+            # Leaves at the end of its current slice
+            process["killed"] = True
+        else:
+            self.io_queue.pop(name, None)
+            self.run_queues[process["cpu"]].dequeue(process)
+            self.exit(process)
+
+    def renice(self, name, nice):
+        process = self.tasks.get(name)
+        if process is None:
+            raise ValueError(f"No live task named {name}")
+        weight = nice_to_weight(nice)
+        if process["cpu"] is not None:
+            self.run_queues[process["cpu"]].reweight(process, weight)
+        else:
+            process["weight"] = weight
+        process["process_obj"].weight = weight
+
+    def exit(self, process):
+        process["terminated"] = True
+        self.metrics.on_exit(process["slot"], self.clock)
+        self.finished += 1
+        if self.keep_finished:
+            self.terminated_processes.add(process["name"])
+            self.finish_times[process["name"]] = self.clock
+        del self.tasks[process["name"]]
+        self.notify({"name": process["name"], "status": "terminated"})
+        self.log(f"Process {process['name']} terminated.")
+
+    def admit(self, process):
+        process["slot"] = self.metrics.register(process["name"], self.clock, process.get("group"))
+        self.enqueue(process)
+        self.log(f"Adding process {process['name']}")
+
+    def enqueue(self, process):
+        cpu = smp.select_cpu(self.run_queues, process)
+        if process["cpu"] is None:
+            self.run_queues[cpu].place(process)
+        elif process["cpu"] != cpu:
+            smp.move_vruntime(process, self.run_queues, process["cpu"], cpu)
+        process["cpu"] = cpu
+        self.run_queues[cpu].enqueue(process)
+
+    def balance(self, cpu, idle):
+        if self.num_cpus == 1:
+            return
+        if idle:
+            migrated = smp.idle_balance(self.run_queues, cpu, self.running)
+        else:
+            migrated = smp.load_balance(self.run_queues, cpu, self.running)
+        self.migrations += len(migrated)
+        for process in migrated:
+            self.log(f"Migrated process {process['name']} to CPU {cpu}")
+
+    def dispatch_idle(self):
+        for cpu in range(self.num_cpus):
+            if self.current[cpu] is None:
+                self.dispatch(cpu)
+
+    def run(self, process_names=[], weights=[], arrivals=None, until=None, affinities=None, groups=None):
+        self.add_processes(process_names, weights, arrivals, affinities, groups)
+        if until is not None:
+            until = int(until * NSEC_PER_SEC)
+        self.dispatch_idle()
+        while self.events:
+            when, _, kind, process = self.events[0]
+            if until is not None and when > until:
+                self.clock = until
+                break
+            heapq.heappop(self.events)
+            self.clock = when
+            if kind == ARRIVAL:
+                if not process["terminated"]:
+                    self.admit(process)
+                if process is self.pending_arrival:
+                    self.next_arrival()
+            elif kind == IO_COMPLETE:
+                self.handle_io_completion(process)
+            elif kind == SLICE_END:
+                self.handle_slice_end(process)
+            self.dispatch_idle()
+        return self.clock / NSEC_PER_SEC
+
+    def run_workload(self, until=None):
+        # A Workload without a task count never runs out, so give it `until`
+        self.feed(self.workload_processes())
+        return self.run(until=until)
+
+    def run_trace(self, records, until=None):
+        # records: burst records as produced by workload_trace.read_trace
+        self.trace = TraceWorkload(records)
+        self.feed(self.trace_processes())
+        return self.run(until=until)
+
+    def workload_processes(self):
+        for name, nice, arrival in self.workload.arrivals(self.rng):
+            yield self.workload_process(name, nice, group=self.next_group()), arrival
+
+    def trace_processes(self):
+        while True:
+            task = self.trace.next_task()
+            if task is None:
+                return
+            name, nice, arrival = task
+            burst = self.trace.next_burst(name)
+            if burst is None:
+                continue
+            process = self.make_process(name, nice, group=self.next_group())
+            process["cpu_left"], process["io_next"] = burst
+            yield process, arrival
+
+    def feed(self, arrivals):
+        # Tasks are taken from `arrivals` one ahead of the clock, so an open
+        # stream of arrivals never has to exist in memory all at once
+        self.arrivals = arrivals
+        self.next_arrival()
+
+    def next_arrival(self):
+        self.pending_arrival = None
+        for process, when in self.arrivals:
+            if self.arrive(process, when):
+                self.pending_arrival = process
+                return
+
+    def dispatch(self, cpu):
+        run_queue = self.run_queues[cpu]
+        if len(run_queue) == 0:
+            self.balance(cpu, idle=True)
+        while len(run_queue) > 0:
+            process = run_queue.pick_next()
+            if self.handle_io(process):
+                continue
+            self.current[cpu] = process
+            self.running.add(process["name"])
+            self.metrics.on_run(process["slot"], self.clock)
+            process["time_slice"] = run_queue.time_slice(process)
+            self.dispatches += 1
+            if self.last_run[cpu] is not process:
+                self.context_switches += 1
+                self.last_run[cpu] = process
+            # A trace task that exits mid-slice only uses the CPU until then
+            end = self.run_worker(process, self.clock, self.clock + process["time_slice"])
+            process["time_slice"] = end - self.clock
+            self.log(f"Running process: {process['name']} on CPU {cpu} (Time Slice: {process['time_slice'] / NSEC_PER_SEC:.2f}s)")
+            self.notify({
+                "name": process['name'],
+                "vRuntime": process['vRuntime'] / NSEC_PER_SEC,
+                "time_slice": process['time_slice'] / NSEC_PER_SEC,
+                "cpu": cpu,
+                "status": "running"
+            })
+            self.schedule(end, SLICE_END, process)
+            return
+
+    def run_worker(self, process, start, end):
+        # Plays the task's CPU bursts for the part of the slice it is not
+        # blocked on I/O; like the real worker it may start I/O mid-slice, which
+        # the scheduler only notices the next time it picks the task. Returns
+        # when the task stops using the CPU: the slice end, or its exit.
+        cursor = start
+        while cursor < end:
+            if process["io_deadline"] is not None and cursor < process["io_deadline"]:
+                cursor = process["io_deadline"]
+                continue
+            run = min(process["cpu_left"], end - cursor)
+            cursor += run
+            process["cpu_left"] -= run
+            if process["cpu_left"] > 0:
+                continue
+            if process["exe_time"] is not None:
+                process["io_duration"] = self.workload.io_burst_ns(self.rng)
+                process["io_deadline"] = cursor + process["io_duration"]
+                process["cpu_left"] = self.workload.cpu_burst_ns(self.rng)
+                continue
+            burst = self.trace.next_burst(process["name"]) if process["io_next"] is not None else None
+            if burst is None:
+                process["exited"] = True
+                return cursor
+            process["io_duration"] = process["io_next"]
+            process["io_deadline"] = cursor + process["io_duration"]
+            process["cpu_left"], process["io_next"] = burst
+        return end
+
+    def handle_slice_end(self, process):
+        cpu = process["cpu"]
+        run_queue = self.run_queues[cpu]
+        self.current[cpu] = None
+        self.running.discard(process["name"])
+        before = process["vRuntime"]
+        run_queue.tick(process, process["time_slice"])
+        if process.get("killed"):
+            finished = True
+        elif process["exe_time"] is None:
+            finished = process["exited"]
+        else:
+            finished = process["process_obj"].service > process["exe_time"]
+        self.metrics.on_stop(process["slot"], self.clock, process["vRuntime"] - before, runnable=not finished)
+        self.log(f"Process {process['name']} vRuntime: {process['vRuntime'] / NSEC_PER_SEC:.3f}")
+        if finished:
+            run_queue.dequeue(process)
+            self.exit(process)
+        self.slices[cpu] += 1
+        if self.slices[cpu] % self.balance_interval == 0:
+            self.balance(cpu, idle=False)
+
+    def handle_io(self, process):
+        deadline = process["io_deadline"]
+        if deadline is None:
+            return False
+        if deadline <= self.clock:
+            process["io_deadline"] = None
+            return False
+        self.run_queues[process["cpu"]].on_io(process)
+        self.run_queues[process["cpu"]].dequeue(process)
+        self.metrics.on_block(process["slot"], self.clock)
+        self.io_queue[process["name"]] = process
+        self.schedule(deadline, IO_COMPLETE, process)
+        self.notify({
+            "name": process['name'],
+            "status": "io_start",
+            "duration": (deadline - self.clock) / NSEC_PER_SEC
+        })
+        self.log(f"Process {process['name']} moved to I/O queue for {(deadline - self.clock) / NSEC_PER_SEC:.3f} seconds")
+        return True
+
+    def handle_io_completion(self, process):
+        if process["terminated"]:
+            return
+        del self.io_queue[process["name"]]
+        process["io_deadline"] = None
+        self.metrics.on_runnable(process["slot"], self.clock)
+        self.enqueue(process)
+        self.notify({"name": process['name'], "status": "io_complete"})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the CFS scheduler on a simulated clock")
+    parser.add_argument("--tasks", type=int, default=4)
+    parser.add_argument("--nice", default="-10", help="nice value or distribution, e.g. choice:-5,0,5")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--cpus", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--policy", default="cfs", choices=list(POLICIES))
+    parser.add_argument("--groups", default=None, help="task groups and shares, e.g. a=2048,b=1024; tasks are "
+                                                       "spread round-robin over the leaf groups")
+    parser.add_argument("--trace", default=None, help="replay a recorded workload (.csv or sched_switch text)")
+    parser.add_argument("--rate", type=float, default=None, help="open system: Poisson arrivals per simulated "
+                                                                 "second, without a task limit (needs --until)")
+    parser.add_argument("--until", type=float, default=None, help="stop after this many simulated seconds")
+    parser.add_argument("--profile", action="store_true", help="time the scheduling hot paths and print a breakdown")
+    args = parser.parse_args()
+
+    if args.rate is not None and (args.rate <= 0 or args.until is None):
+        parser.error("--rate needs a positive rate and --until")
+    try:
+        if args.rate is not None:
+            workload = Workload(tasks=None, nice=args.nice, interarrival=f"exp:{1 / args.rate}")
+        else:
+            workload = Workload(tasks=args.tasks, nice=args.nice)
+        groups = TaskGroups.parse(args.groups) if args.groups else None
+        sim = Simulation(seed=args.seed, verbose=args.verbose, num_cpus=args.cpus, workload=workload,
+                         policy=args.policy, groups=groups)
+    except ValueError as e:
+        parser.error(str(e))
+    profiler = Profiler().enable() if args.profile else None
+    started = time.perf_counter()
+    if args.trace is not None:
+        try:
+            sim_time = sim.run_trace(read_trace(args.trace), until=args.until)
+        except ValueError as e:
+            parser.error(f"{args.trace}: {e}")
+    else:
+        sim_time = sim.run_workload(until=args.until)
+    elapsed = time.perf_counter() - started
+    if profiler is not None:
+        profiler.disable()
+    print(f"Simulated {sim_time:.2f}s of scheduling ({sim.dispatches} dispatches, "
+          f"{sim.context_switches} context switches, {sim.migrations} migrations, {sim.finished} tasks finished) in {elapsed:.3f}s")
+    sim.metrics.print_report(sim.clock)
+    if profiler is not None:
+        profiler.print_report()
@@ -0,0 +1,97 @@
+from itertools import islice
+
+# Load balancing between per-CPU run queues. Shared by Scheduler and
+# Simulation; callers hold whatever lock protects the queues.
+
+# Periodic balancing only moves load when the busiest queue carries this much
+# more weight than the local one (percent), like the kernel's imbalance_pct
+IMBALANCE_PCT = 125
+
+# Upper bound on tasks examined per balancing pass, like sysctl nr_migrate
+MIGRATE_SCAN = 32
+
+
+def allowed(process, cpu):
+    affinity = process.get("affinity")
+    return affinity is None or cpu in affinity
+
+
+def can_migrate(process, cpu, running):
+    return process["name"] not in running and allowed(process, cpu)
+
+
+def check_affinity(name, affinity, num_cpus):
+    # For callers that must reject a task before doing anything with it
+    if affinity is not None and not any(cpu in affinity for cpu in range(num_cpus)):
+        raise ValueError(f"Process {name} has no allowed CPU in its affinity mask")
+
+
+def select_cpu(run_queues, process):
+    # Least loaded CPU the task may run on, used on start-up and wake-up
+    candidates = [cpu for cpu in range(len(run_queues)) if allowed(process, cpu)]
+    if not candidates:
+        raise ValueError(f"Process {process['name']} has no allowed CPU in its affinity mask")
+    return min(candidates, key=lambda cpu: (run_queues[cpu].load, len(run_queues[cpu])))
+
+
+def move_vruntime(process, run_queues, src, dst):
+    # Keep the task's lag relative to the queue it joins
+    delta = run_queues[dst].min_vruntime_for(process) - run_queues[src].min_vruntime_for(process)
+    process["process_obj"].vRuntime += delta
+    process["vRuntime"] = process["process_obj"].vRuntime
+    if "deadline" in process:
+        process["deadline"] += delta
+
+
+def migrate(process, run_queues, dst):
+    src = process["cpu"]
+    run_queues[src].dequeue(process)
+    move_vruntime(process, run_queues, src, dst)
+    process["cpu"] = dst
+    run_queues[dst].enqueue(process)
+
+
+def find_busiest(run_queues, cpu):
+    busiest = None
+    for other in range(len(run_queues)):
+        if other == cpu or len(run_queues[other]) < 2:
+            continue
+        if busiest is None or run_queues[other].load > run_queues[busiest].load:
+            busiest = other
+    return busiest
+
+
+def idle_balance(run_queues, cpu, running):
+    # An idle CPU pulls one waiting task from the busiest queue it may take from
+    busiest = find_busiest(run_queues, cpu)
+    if busiest is None:
+        return []
+    for process in islice(run_queues[busiest], MIGRATE_SCAN):
+        if can_migrate(process, cpu, running):
+            migrate(process, run_queues, cpu)
+            return [process]
+    return []
+
+
+def load_balance(run_queues, cpu, running, imbalance_pct=IMBALANCE_PCT):
+    # Periodic balancing: pull waiting tasks from the busiest queue until the
+    # weight difference is gone, never moving a task that would overshoot
+    busiest = find_busiest(run_queues, cpu)
+    if busiest is None:
+        return []
+    local, remote = run_queues[cpu], run_queues[busiest]
+    if remote.load * 100 <= local.load * imbalance_pct:
+        return []
+    imbalance = (remote.load - local.load) // 2
+    migrated = []
+    # A task's load is its weight, scaled by its groups' shares under GroupCFS
+    candidates = sorted(((remote.task_load(p), p) for p in islice(remote, MIGRATE_SCAN)),
+                        key=lambda candidate: candidate[0], reverse=True)
+    for load, process in candidates:
+        if imbalance <= 0:
+            break
+        if load <= imbalance and can_migrate(process, cpu, running):
+            migrate(process, run_queues, cpu)
+            imbalance -= load
+            migrated.append(process)
+    return migrated
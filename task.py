@@ -0,0 +1,42 @@
+from weights import NSEC_PER_SEC, calc_delta_fair, nice_to_weight
+
+
+# Scheduling period tunables, in the spirit of sched_latency_ns and
+# sched_min_granularity_ns. Up to nr_latency runnable tasks share one latency
+# period; beyond that the period stretches so no slice drops below
+# min_granularity. A min_granularity of 0 disables stretching.
+class SchedTunables:
+    def __init__(self, latency=10 * NSEC_PER_SEC, min_granularity=10 * NSEC_PER_SEC // 8):
+        self.latency = latency
+        self.min_granularity = min_granularity
+        self.nr_latency = latency // min_granularity if min_granularity else None
+
+    def period(self, nr_running):
+        if self.nr_latency is not None and nr_running > self.nr_latency:
+            return nr_running * self.min_granularity
+        return self.latency
+
+    def time_slice(self, p_weight, load, nr_running):
+        return self.period(nr_running) * p_weight // max(load, p_weight)
+
+
+# vRuntime accounting shared by every task model, whether it is backed by a
+# real worker (ProcessCreate) or only simulated. Times and vRuntimes are
+# integer nanoseconds. `service` sums the same weighted deltas but, unlike
+# vRuntime, is never moved by placement or migration, so it measures how much
+# work a task has done.
+class TaskAccount:
+    def __init__(self):
+        self.vRuntime = 0
+        self.service = 0
+        self.time_slice = 0
+        self.weight = 0
+
+    def calculate_vRuntime(self, p_weight, delta_exec):
+        delta = calc_delta_fair(delta_exec, p_weight)
+        self.vRuntime += delta
+        self.service += delta
+        return self.vRuntime
+
+    def weight_calculate(self, niceness):
+        self.weight = nice_to_weight(niceness)
@@ -0,0 +1,101 @@
+import struct
+from collections import deque
+from multiprocessing import shared_memory
+
+# Task states as seen by the worker
+RUNNABLE = 0
+IO_WAIT = 1
+
+# Column name -> struct format. One contiguous block holds every column back
+# to back (struct-of-arrays). Columns are typed memoryviews rather than NumPy
+# arrays: every access is a single slot, and workers then start without
+# importing NumPy.
+COLUMNS = [
+    ("vruntime", "q"),
+    ("io_deadline", "d"),
+    ("io_duration", "d"),
+    ("weight", "q"),
+    ("state", "b"),
+]
+
+
+# Per-task state table shared between the scheduler and its workers. Workers
+# write state/io_deadline/io_duration for their own slot; the scheduler owns
+# vruntime and weight and marks I/O done once io_deadline has passed. With
+# shared=True the block lives in multiprocessing.shared_memory so worker
+# processes see it without copies.
+class TaskTable:
+    def __init__(self, capacity, shared=False, name=None):
+        self.capacity = capacity
+        self.shared = shared
+        size = sum(struct.calcsize(fmt) for _, fmt in COLUMNS) * capacity
+        if shared:
+            if name is None:
+                self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+                self.owner = True
+            else:
+                self.shm = shared_memory.SharedMemory(name=name)
+                self.owner = False
+            buffer = self.shm.buf
+        else:
+            self.shm = None
+            self.owner = True
+            buffer = bytearray(size)
+        if self.owner:
+            buffer[:size] = bytes(size)
+        self.bind(buffer)
+        self.next_slot = 0
+        self.released = deque()
+
+    def bind(self, buffer):
+        # The views are kept so close() can release them before the block is unmapped
+        self.views = []
+        offset = 0
+        for column, fmt in COLUMNS:
+            nbytes = struct.calcsize(fmt) * self.capacity
+            raw = memoryview(buffer)[offset:offset + nbytes]
+            view = raw.cast(fmt)
+            self.views += [view, raw]
+            setattr(self, column, view)
+            offset += nbytes
+
+    def allocate(self):
+        if self.released:
+            slot = self.released.popleft()
+            for column, _ in COLUMNS:
+                getattr(self, column)[slot] = 0
+            return slot
+        if self.next_slot >= self.capacity:
+            raise RuntimeError(f"Task table is full ({self.capacity} slots)")
+        slot = self.next_slot
+        self.next_slot += 1
+        return slot
+
+    def release(self, slot):
+        # The slot of an exited task. Released slots are reused oldest first,
+        # which gives a worker that is still winding down the longest time
+        # before its slot changes hands (it writes nothing once it sees its
+        # shutdown_flag)
+        self.released.append(slot)
+
+    def close(self):
+        if self.shm is None:
+            return
+        for column, _ in COLUMNS:
+            setattr(self, column, None)
+        for view in self.views:
+            view.release()
+        self.views = []
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
+
+    def __getstate__(self):
+        # Worker processes started with spawn attach to the block by name
+        if not self.shared:
+            raise TypeError("An in-process TaskTable cannot be shared with another process")
+        return {"capacity": self.capacity, "name": self.shm.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["capacity"], shared=True, name=state["name"])
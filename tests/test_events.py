@@ -0,0 +1,81 @@
+import threading
+from events import EventChannel
+
+
+def running(name, cpu=0):
+    return {"name": name, "vRuntime": 0.0, "time_slice": 0.01, "cpu": cpu, "status": "running"}
+
+
+def statuses(batch):
+    return [(m["name"], m["status"]) for m in batch]
+
+
+def test_coalesced_dispatch_stays_after_the_task_arrival():
+    channel = EventChannel()
+    channel.put(running("a"))
+    channel.put({"name": "c", "status": "new"})
+    channel.put(running("c"))
+    assert statuses(channel.drain()) == [("c", "new"), ("c", "running")]
+    assert channel.coalesced == 1
+
+
+def test_coalesced_dispatch_stays_after_io():
+    channel = EventChannel()
+    channel.put(running("a"))
+    channel.put({"name": "b", "status": "io_start", "duration": 0.1})
+    channel.put({"name": "b", "status": "io_complete"})
+    channel.put(running("b"))
+    assert statuses(channel.drain()) == [("b", "io_start"), ("b", "io_complete"), ("b", "running")]
+
+
+def test_other_message_about_the_task_closes_its_dispatch():
+    channel = EventChannel()
+    channel.put(running("a"))
+    channel.put({"name": "a", "status": "terminated"})
+    channel.put(running("b"))
+    assert statuses(channel.drain()) == [("a", "running"), ("a", "terminated"), ("b", "running")]
+
+
+def test_cpus_coalesce_separately():
+    channel = EventChannel()
+    for i in range(10):
+        channel.put(running(f"t{i}", cpu=i % 2))
+    batch = channel.drain()
+    assert [(m["name"], m["cpu"]) for m in batch] == [("t8", 0), ("t9", 1)]
+    assert len(channel) == 0
+
+
+def test_full_channel():
+    channel = EventChannel(capacity=2)
+    assert channel.put({"name": "a", "status": "new"})
+    assert channel.put(running("a"))
+    assert len(channel) == 2
+    assert not channel.put({"name": "b", "status": "new"}, block=False)
+    # Replacing a queued dispatch takes no extra room, so it never waits
+    assert channel.put(running("b"), block=False)
+    assert statuses(channel.drain()) == [("a", "new"), ("b", "running")]
+
+
+def test_blocked_put_resumes_after_drain():
+    channel = EventChannel(capacity=1)
+    channel.put({"name": "a", "status": "new"})
+    done = threading.Event()
+
+    def producer():
+        channel.put({"name": "b", "status": "new"})
+        done.set()
+    thread = threading.Thread(target=producer)
+    thread.start()
+    assert not done.wait(0.05)
+    assert statuses(channel.drain()) == [("a", "new")]
+    assert done.wait(5)
+    thread.join()
+    assert statuses(channel.drain()) == [("b", "new")]
+
+
+def test_dead_entries_are_compacted():
+    channel = EventChannel(capacity=4)
+    for i in range(100):
+        channel.put(running(f"t{i}"))
+    assert len(channel.entries) <= channel.capacity + 1
+    assert statuses(channel.drain()) == [("t99", "running")]
@@ -0,0 +1,109 @@
+import random
+import pytest
+from policies import POLICIES, TaskGroups, make_run_queue, make_run_queues
+from simulation import Simulation
+from task import SchedTunables, TaskAccount
+from weights import nice_to_weight
+from workload import Workload
+
+TUNABLES = SchedTunables(6000000, 750000)
+
+
+def make_process(name, nice=0, group=None):
+    p = TaskAccount()
+    p.weight_calculate(nice)
+    return {"name": name, "process_obj": p, "weight": p.weight, "vRuntime": 0, "group": group}
+
+
+def run_queues():
+    for policy in POLICIES:
+        yield policy, lambda policy=policy: make_run_queue(policy, TUNABLES)
+    yield "groups", lambda: make_run_queue("cfs", TUNABLES, TaskGroups.parse("a=2048,a/x,b"))
+
+
+@pytest.mark.parametrize("name, factory", list(run_queues()))
+def test_queue_contract(name, factory):
+    # len, `in`, iteration and load follow enqueue/dequeue/reweight, and
+    # pick_next only returns queued tasks
+    rng = random.Random(8)
+    run_queue = factory()
+    groups = [None, "a/x", "b"] if name == "groups" else [None]
+    processes = [make_process(f"pro{i}", rng.randint(-5, 5), groups[i % len(groups)]) for i in range(24)]
+    for process in processes:
+        run_queue.place(process)
+    queued = {}
+    for _ in range(2000):
+        process = rng.choice(processes)
+        op = rng.randrange(4)
+        if op == 0:
+            run_queue.enqueue(process)
+            queued[process["name"]] = process
+        elif op == 1:
+            run_queue.dequeue(process)
+            queued.pop(process["name"], None)
+        elif op == 2:
+            run_queue.reweight(process, nice_to_weight(rng.randint(-5, 5)))
+        else:
+            picked = run_queue.pick_next()
+            if picked is None:
+                assert not queued
+            else:
+                assert picked["name"] in queued
+                run_queue.tick(picked, run_queue.time_slice(picked))
+        assert len(run_queue) == len(queued)
+        assert sorted(p["name"] for p in run_queue) == sorted(queued)
+        # Under groups, load is the root queue's and task_load rounds down at each level
+        task_loads = sum(run_queue.task_load(p) for p in queued.values())
+        if name == "groups":
+            assert 0 <= run_queue.load - task_loads <= 2 * len(queued)
+        else:
+            assert run_queue.load == task_loads == sum(p["weight"] for p in queued.values())
+        assert (process in run_queue) == (process["name"] in queued)
+
+
+@pytest.mark.parametrize("policy", ["cfs", "eevdf"])
+def test_cpu_share_follows_weight(policy):
+    run_queue = make_run_queue(policy, TUNABLES)
+    heavy, light = make_process("heavy", 0), make_process("light", 5)
+    for process in (heavy, light):
+        run_queue.place(process)
+        run_queue.enqueue(process)
+    used = {"heavy": 0, "light": 0}
+    for _ in range(2000):
+        process = run_queue.pick_next()
+        delta = run_queue.time_slice(process)
+        used[process["name"]] += delta
+        run_queue.tick(process, delta)
+    assert used["heavy"] / used["light"] == pytest.approx(1024 / 335, rel=0.05)
+
+
+def test_group_shares_follow_load_across_cpus():
+    cpu0, cpu1 = make_run_queues(2, "cfs", TUNABLES, TaskGroups.parse("a=3072,b"))
+    tasks = [make_process(f"a{i}", group="a") for i in range(4)]
+    cpu0.enqueue(tasks[0])
+    assert cpu0.entity("a")["weight"] == 3072
+    for process in tasks[1:]:
+        cpu1.enqueue(process)
+    assert (cpu0.entity("a")["weight"], cpu1.entity("a")["weight"]) == (768, 2304)
+    assert cpu0.load == 768 and cpu1.load == 2304
+    assert cpu1.task_load(tasks[1]) == 768
+    cpu1.dequeue(tasks[1])
+    assert (cpu0.entity("a")["weight"], cpu1.entity("a")["weight"]) == (1024, 2048)
+
+
+@pytest.mark.parametrize("num_cpus", [1, 2, 4])
+def test_group_shares_split_the_cpu(num_cpus):
+    # Enough tasks that each group has one on every CPU
+    groups = TaskGroups.parse("a=3072,b=1024")
+    workload = Workload(tasks=2 * num_cpus, exe_time="100", cpu_burst="100", interarrival="0")
+    sim = Simulation(seed=1, num_cpus=num_cpus, tunables=TUNABLES, workload=workload, groups=groups)
+    sim.run_workload(until=2.0)
+    usage = sim.metrics.group_usage()
+    assert usage["a"] / (usage["a"] + usage["b"]) == pytest.approx(0.75, abs=0.01)
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        make_run_queue("fifo")
+    with pytest.raises(ValueError):
+        make_run_queue("rr", groups=TaskGroups.parse("a"))
@@ -0,0 +1,93 @@
+import random
+from run_queue import RunQueue
+
+
+def make_process(i, rng):
+    return {"name": f"pro{i}", "vRuntime": rng.randrange(1000), "weight": rng.choice([15, 335, 1024, 9548])}
+
+
+def check(run_queue, reference):
+    # Same tasks, heap order and index, and the load of what is queued
+    assert len(run_queue) == len(reference)
+    assert run_queue.load == sum(p["weight"] for p in reference.values())
+    for name, pos in run_queue.index.items():
+        assert run_queue.heap[pos][2]["name"] == name
+    for pos in range(1, len(run_queue.heap)):
+        parent = run_queue.heap[(pos - 1) // 2]
+        assert parent[:2] <= run_queue.heap[pos][:2]
+    if reference:
+        assert run_queue.pick_next()["vRuntime"] == min(p["vRuntime"] for p in reference.values())
+    else:
+        assert run_queue.pick_next() is None
+
+
+def test_random_operations_match_sorted_reference():
+    rng = random.Random(1)
+    run_queue = RunQueue()
+    reference = {}
+    processes = [make_process(i, rng) for i in range(64)]
+    for _ in range(5000):
+        process = rng.choice(processes)
+        op = rng.randrange(4)
+        if op == 0:
+            run_queue.enqueue(process)
+            reference[process["name"]] = process
+        elif op == 1:
+            assert run_queue.dequeue(process) == (process["name"] in reference)
+            reference.pop(process["name"], None)
+        elif op == 2:
+            process["vRuntime"] = rng.randrange(1000)
+            run_queue.update(process)
+        else:
+            run_queue.reweight(process, rng.choice([15, 335, 1024, 9548]))
+        check(run_queue, reference)
+        assert (process in run_queue) == (process["name"] in reference)
+
+
+def test_pop_order_is_sorted_and_fifo_on_ties():
+    rng = random.Random(2)
+    run_queue = RunQueue()
+    processes = [{"name": f"pro{i}", "vRuntime": rng.randrange(8), "weight": 1024} for i in range(100)]
+    for process in processes:
+        run_queue.enqueue(process)
+    # sorted() is stable, so equal vRuntimes keep their enqueue order
+    expected = [p["name"] for p in sorted(processes, key=lambda p: p["vRuntime"])]
+    popped = []
+    while len(run_queue):
+        popped.append(run_queue.pop_next()["name"])
+    assert popped == expected
+    assert run_queue.load == 0 and run_queue.index == {}
+
+
+def test_enqueue_twice_is_ignored():
+    run_queue = RunQueue()
+    process = {"name": "a", "vRuntime": 5, "weight": 1024}
+    run_queue.enqueue(process)
+    run_queue.enqueue(process)
+    assert len(run_queue) == 1
+    assert run_queue.load == 1024
+
+
+def test_reweight_of_unqueued_task_leaves_load():
+    run_queue = RunQueue()
+    queued = {"name": "a", "vRuntime": 0, "weight": 1024}
+    idle = {"name": "b", "vRuntime": 0, "weight": 1024}
+    run_queue.enqueue(queued)
+    run_queue.reweight(idle, 335)
+    assert idle["weight"] == 335
+    assert run_queue.load == 1024
+    run_queue.reweight(queued, 9548)
+    assert run_queue.load == 9548
+
+
+def test_min_vruntime_never_goes_back():
+    run_queue = RunQueue()
+    a = {"name": "a", "vRuntime": 10, "weight": 1024}
+    b = {"name": "b", "vRuntime": 20, "weight": 1024}
+    run_queue.enqueue(a)
+    run_queue.enqueue(b)
+    assert run_queue.min_vruntime == 10
+    run_queue.dequeue(a)
+    assert run_queue.min_vruntime == 20
+    run_queue.enqueue({"name": "c", "vRuntime": 5, "weight": 1024})
+    assert run_queue.min_vruntime == 20
@@ -0,0 +1,86 @@
+import threading
+import time
+import pytest
+from events import EventChannel
+from scheduler import Scheduler
+from task import SchedTunables
+
+MS = 1000000
+
+
+@pytest.fixture
+def scheduler():
+    # An open system on the generator backend with short slices, stopped
+    # (every task killed) at the end of the test
+    scheduler = Scheduler(EventChannel(capacity=1 << 16), "generator", num_cpus=2,
+                          tunables=SchedTunables(20 * MS, 5 * MS), seed=1)
+    thread = threading.Thread(target=scheduler.run_scheduler, kwargs={"open_system": True, "capacity": 4},
+                              daemon=True)
+    thread.start()
+    while scheduler.table is None:
+        thread.join(0.01)
+    yield scheduler
+    scheduler.stop()
+    thread.join(10)
+    assert not thread.is_alive()
+
+
+def test_rejected_submit_leaves_no_trace(scheduler):
+    for kwargs in ({"affinity": [3]}, {"group": "nope"}):
+        with pytest.raises(ValueError):
+            scheduler.submit("x", **kwargs)
+        with scheduler.lock:
+            assert "x" not in scheduler.tasks
+            assert scheduler.metrics.registered == 0
+            assert len(scheduler.outbox) == len(scheduler.notify_queue) == 0
+    scheduler.submit("x", affinity=[1])
+    assert scheduler.tasks["x"]["cpu"] == 1
+
+
+def wait_until(scheduler, condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with scheduler.lock:
+            if condition():
+                return
+        time.sleep(0.01)
+    raise AssertionError("timed out")
+
+
+def test_submit_kill_renice(scheduler):
+    scheduler.submit("a")
+    scheduler.submit("b", nice=5)
+    with pytest.raises(ValueError):
+        scheduler.submit("a")
+    assert scheduler.tasks["b"]["weight"] == 335
+    scheduler.renice("b", -5)
+    with scheduler.lock:
+        process = scheduler.tasks["b"]
+        assert process["weight"] == process["process_obj"].weight == 3121
+        assert scheduler.table.weight[process["process_obj"].slot] == 3121
+    scheduler.kill("a")
+    wait_until(scheduler, lambda: "a" not in scheduler.tasks)
+    with pytest.raises(ValueError):
+        scheduler.kill("a")
+    with pytest.raises(ValueError):
+        scheduler.renice("a", 0)
+    statuses = {(m["name"], m["status"]) for m in scheduler.notify_queue.drain()}
+    assert {("a", "new"), ("b", "new"), ("a", "terminated")} <= statuses
+
+
+def test_open_system_reuses_slots(scheduler):
+    # Far more arrivals than the table's 4 slots, never more than 2 alive
+    for i in range(20):
+        scheduler.submit(f"t{i}")
+        scheduler.submit(f"u{i}")
+        scheduler.kill(f"t{i}")
+        scheduler.kill(f"u{i}")
+        wait_until(scheduler, lambda: not scheduler.tasks)
+        scheduler.notify_queue.drain()
+    with scheduler.lock:
+        assert scheduler.table.next_slot <= 4
+        assert len(scheduler.metrics.names) <= 4
+        assert scheduler.metrics.registered == scheduler.metrics.finished == 40
+        assert not scheduler.terminated_processes
+    # A finished task's name is free again
+    scheduler.submit("t0")
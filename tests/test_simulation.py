@@ -0,0 +1,103 @@
+import time
+import pytest
+from policies import POLICIES
+from simulation import Simulation
+from task import SchedTunables
+from workload import Workload
+
+
+class Recorder:
+    def __init__(self):
+        self.messages = []
+
+    def put(self, message):
+        self.messages.append(message)
+
+
+def workload():
+    return Workload(tasks=12, nice="choice:-5,0,5", cpu_burst="exp:0.002", io_burst="exp:0.01",
+                    exe_time="uniform:0.01,0.05", interarrival="exp:0.001")
+
+
+def simulate(seed, policy="cfs", num_cpus=2):
+    recorder = Recorder()
+    sim = Simulation(notify_queue=recorder, seed=seed, num_cpus=num_cpus, tunables=SchedTunables(6000000, 750000),
+                     workload=workload(), policy=policy)
+    end = sim.run_workload()
+    return end, sim, recorder.messages
+
+
+@pytest.mark.parametrize("policy", list(POLICIES))
+def test_same_seed_same_run(policy):
+    end, sim, messages = simulate(3, policy)
+    again_end, again, again_messages = simulate(3, policy)
+    assert end == again_end
+    assert messages == again_messages
+    assert sim.finish_times == again.finish_times
+    assert (sim.dispatches, sim.context_switches, sim.migrations) == \
+        (again.dispatches, again.context_switches, again.migrations)
+    assert sim.metrics.report(sim.clock) == again.metrics.report(again.clock)
+
+
+def test_different_seed_different_run():
+    _, _, messages = simulate(3)
+    _, _, other = simulate(4)
+    assert messages != other
+
+
+def test_every_task_finishes():
+    _, sim, messages = simulate(5)
+    assert sim.finished == 12
+    assert set(sim.finish_times) == {f"pro{i}" for i in range(1, 13)}
+    assert max(sim.finish_times.values()) == sim.clock
+    assert sum(1 for m in messages if m["status"] == "terminated") == 12
+
+
+def test_never_sleeps(monkeypatch):
+    def sleep(seconds):
+        raise AssertionError("the simulation slept")
+    monkeypatch.setattr(time, "sleep", sleep)
+    simulate(6)
+
+
+def test_rejected_submit_leaves_no_trace():
+    sim = Simulation(seed=1, num_cpus=2, workload=workload())
+    for kwargs in ({"affinity": [3]}, {"group": "nope"}):
+        with pytest.raises(ValueError):
+            sim.submit("x", **kwargs)
+        assert "x" not in sim.tasks
+        assert sim.metrics.registered == 0
+    sim.submit("x", affinity=[1])
+    sim.kill("x")
+    assert "x" not in sim.tasks
+
+
+def test_submit_kill_renice():
+    sim = Simulation(seed=1, workload=workload())
+    sim.submit("a")
+    sim.submit("b", nice=5)
+    sim.submit("later", at=1.0)
+    with pytest.raises(ValueError):
+        sim.submit("a")
+    sim.renice("b", -5)
+    assert sim.tasks["b"]["weight"] == 3121
+    assert sim.run_queues[0].load == 1024 + 3121
+    sim.kill("later")
+    sim.run(until=0.5)
+    # Running tasks leave at the end of their slice
+    sim.kill("a")
+    sim.run()
+    with pytest.raises(ValueError):
+        sim.kill("a")
+    assert set(sim.finish_times) == {"a", "b"}
+
+
+def test_open_workload_keeps_only_live_tasks():
+    open_workload = Workload(tasks=None, nice="0", cpu_burst="exp:0.002", io_burst="exp:0.01",
+                             exe_time="uniform:0.01,0.05", interarrival="exp:0.02")
+    sim = Simulation(seed=2, num_cpus=2, tunables=SchedTunables(6000000, 750000), workload=open_workload)
+    sim.run_workload(until=30.0)
+    assert sim.finished > 1000
+    assert not sim.finish_times and not sim.terminated_processes
+    assert len(sim.metrics.names) < 100
+    assert sim.metrics.report(sim.clock)["finished"] == sim.finished
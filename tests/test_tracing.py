@@ -0,0 +1,83 @@
+import pytest
+from tracing import ARRIVE, EXIT, IO_COMPLETE, IO_START, RUNNING, STOP, TraceReader, TraceWriter, replay
+from weights import NSEC_PER_SEC
+
+
+class Recorder:
+    def __init__(self):
+        self.messages = []
+
+    def put(self, message):
+        self.messages.append(message)
+
+
+def write_trace(path):
+    # Two tasks on two CPUs; capacity=2 makes the writer grow the file twice
+    writer = TraceWriter(str(path), capacity=2)
+    writer.register(0, "a", 0)
+    writer.register(1, "b", 0)
+    writer.write(0, 0, RUNNING, vruntime=0, value=4000000, cpu=0)
+    writer.write(0, 1, RUNNING, vruntime=0, value=4000000, cpu=1)
+    writer.write(4000000, 0, STOP, vruntime=4000000, value=4000000)
+    writer.write(4000000, 0, IO_START, value=NSEC_PER_SEC // 100)
+    writer.write(6000000, 1, STOP, vruntime=6000000, value=6000000)
+    writer.write(6000000, 1, EXIT)
+    writer.write(14000000, 0, IO_COMPLETE)
+    writer.write(14000000, 0, RUNNING, vruntime=4000000, value=4000000, cpu=0)
+    writer.write(16000000, 0, STOP, vruntime=6000000, value=2000000)
+    writer.write(16000000, 0, EXIT)
+    writer.close()
+    return writer
+
+
+def test_reader_returns_what_was_written(tmp_path):
+    path = tmp_path / "run.trace"
+    writer = write_trace(path)
+    reader = TraceReader(str(path))
+    try:
+        assert reader.names == ["a", "b"]
+        assert len(reader) == writer.count == 12
+        records = list(reader)
+    finally:
+        reader.close()
+    assert records[0] == (0, 0, 0, 0, ARRIVE, 0)
+    assert records[3] == (0, 0, 4000000, 1, RUNNING, 1)
+    assert records[5] == (4000000, 0, NSEC_PER_SEC // 100, 0, IO_START, 0)
+    assert records[-1] == (16000000, 0, 0, 0, EXIT, 0)
+    assert [r[0] for r in records] == sorted(r[0] for r in records)
+
+
+def test_replay_messages_and_metrics(tmp_path):
+    path = tmp_path / "run.trace"
+    write_trace(path)
+    recorder = Recorder()
+    metrics, end = replay(str(path), notify_queue=recorder)
+    assert end == 16000000
+    assert [(m["name"], m["status"]) for m in recorder.messages] == [
+        ("a", "new"), ("b", "new"), ("a", "running"), ("b", "running"), ("a", "io_start"),
+        ("b", "terminated"), ("a", "io_complete"), ("a", "running"), ("a", "terminated"),
+    ]
+    assert recorder.messages[3] == {"name": "b", "vRuntime": 0.0, "time_slice": 0.004, "cpu": 1, "status": "running"}
+    report = metrics.report(end)
+    assert report["tasks"] == report["finished"] == 2
+    assert report["dispatches"] == 3
+    assert report["run_time"] == 0.012
+    # Both tasks ran as soon as they were runnable
+    assert report["wait_time"] == 0.0
+
+
+def test_replay_is_repeatable(tmp_path):
+    path = tmp_path / "run.trace"
+    write_trace(path)
+    first, second = Recorder(), Recorder()
+    metrics, end = replay(str(path), notify_queue=first)
+    again, again_end = replay(str(path), notify_queue=second)
+    assert first.messages == second.messages
+    assert metrics.report(end) == again.report(again_end)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not.trace"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        TraceReader(str(path))
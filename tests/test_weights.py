@@ -0,0 +1,42 @@
+from weights import (NICE_0_LOAD, NSEC_PER_SEC, WMULT_SHIFT, calc_delta_fair, inverse_weight, nice_to_weight,
+                     sched_prio_to_weight, sched_prio_to_wmult)
+
+
+def test_nice_to_weight_matches_kernel_table():
+    assert nice_to_weight(0) == NICE_0_LOAD == 1024
+    assert nice_to_weight(-20) == 88761
+    assert nice_to_weight(-10) == 9548
+    assert nice_to_weight(-1) == 1277
+    assert nice_to_weight(1) == 820
+    assert nice_to_weight(5) == 335
+    assert nice_to_weight(10) == 110
+    assert nice_to_weight(19) == 15
+
+
+def test_nice_is_clamped():
+    assert nice_to_weight(-40) == 88761
+    assert nice_to_weight(40) == 15
+
+
+def test_wmult_is_inverse_of_weight():
+    assert len(sched_prio_to_weight) == len(sched_prio_to_wmult) == 40
+    for weight, wmult in zip(sched_prio_to_weight, sched_prio_to_wmult):
+        assert abs(wmult - (1 << WMULT_SHIFT) / weight) <= 1
+    assert inverse_weight(2048) == ((1 << WMULT_SHIFT) - 1) // 2048
+
+
+def test_calc_delta_fair_nice_0_is_exact():
+    assert calc_delta_fair(3000000, NICE_0_LOAD) == 3000000
+
+
+def test_calc_delta_fair_fixed_point_values():
+    # delta * 1024 * wmult >> 32, as __calc_delta() computes it
+    assert calc_delta_fair(NSEC_PER_SEC, 335) == NSEC_PER_SEC * 1024 * 12820798 >> 32 == 3056716442
+    assert calc_delta_fair(NSEC_PER_SEC, 88761) == 11536598
+    assert calc_delta_fair(1000000, 15) == 68266666
+
+
+def test_calc_delta_fair_close_to_exact_ratio():
+    for weight in sched_prio_to_weight:
+        exact = NSEC_PER_SEC * NICE_0_LOAD / weight
+        assert abs(calc_delta_fair(NSEC_PER_SEC, weight) - exact) <= exact * 1e-6 + 1
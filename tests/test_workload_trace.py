@@ -0,0 +1,90 @@
+import pytest
+from simulation import Simulation
+from workload_trace import TraceWorkload, read_csv, read_sched_switch
+
+MS = 1000000
+
+SCHED_SWITCH = """\
+# tracer: nop
+          <idle>-0     [000] d..2   100.000000: sched_switch: prev_comm=swapper/0 prev_pid=0 prev_prio=120 prev_state=R ==> next_comm=hog next_pid=10 next_prio=120
+             hog-10    [000] d..2   100.001000: sched_wakeup_new: comm=io pid=20 prio=125 target_cpu=000
+             hog-10    [000] d..2   100.004000: sched_switch: prev_comm=hog prev_pid=10 prev_prio=120 prev_state=R ==> next_comm=io next_pid=20 next_prio=125
+              io-20    [000] d..2   100.005000: sched_switch: prev_comm=io prev_pid=20 prev_prio=125 prev_state=S ==> next_comm=hog next_pid=10 next_prio=120
+          <idle>-0     [001] d..2   100.007000: sched_wakeup: comm=io pid=20 prio=125 target_cpu=000
+             hog-10    [000] d..2   100.010000: sched_switch: prev_comm=hog prev_pid=10 prev_prio=120 prev_state=X ==> next_comm=io next_pid=20 next_prio=125
+              io-20    [000] d..2   100.012000: sched_process_exit: comm=io pid=20 prio=125
+              io-20    [000] d..2   100.012000: sched_switch: prev_comm=io prev_pid=20 prev_prio=125 prev_state=X ==> next_comm=swapper/0 next_pid=0 next_prio=120
+          <idle>-0     [000] d..2   100.013000: sched_switch: prev_comm=swapper/0 prev_pid=0 prev_prio=120 prev_state=R ==> next_comm=hog next_pid=10 next_prio=120
+"""
+
+
+def test_read_sched_switch(tmp_path):
+    path = tmp_path / "sched.txt"
+    path.write_text(SCHED_SWITCH)
+    assert list(read_sched_switch(str(path))) == [
+        (0, "hog-10", 0, None, None),
+        (1 * MS, "io-20", 5, None, None),
+        # io ran 4-5ms, slept until its wakeup at 7ms
+        (1 * MS, "io-20", 5, 1 * MS, 2 * MS),
+        # hog's preemption at 4ms doesn't end its burst; without a
+        # sched_process_exit its exit is the X switch-out
+        (0, "hog-10", 0, 9 * MS, None),
+        # ftrace logs the exit before the final switch-out, which adds nothing
+        (1 * MS, "io-20", 5, 2 * MS, None),
+        # A reused pid is a new task
+        (13 * MS, "hog-10.2", 0, None, None),
+        (13 * MS, "hog-10.2", 0, 1, None),
+    ]
+
+
+def test_sched_switch_drives_the_simulation(tmp_path):
+    path = tmp_path / "sched.txt"
+    path.write_text(SCHED_SWITCH)
+    sim = Simulation()
+    sim.run_trace(read_sched_switch(str(path)))
+    assert sim.finished == 3
+    # Tasks join at their arrival, not at their first completed burst
+    assert list(zip(sim.metrics.names, sim.metrics.arrival)) == [("hog-10", 0), ("io-20", 1 * MS), ("hog-10.2", 13 * MS)]
+
+
+def test_read_csv(tmp_path):
+    path = tmp_path / "trace.csv"
+    path.write_text("task,arrival,nice,cpu,io\nweb,0.0,0,0.004,0.020\ndb,0.001,5,0.010,0.002\n"
+                    "web,0.0,0,0.003,\ndb,0.001,5,0.008,\n")
+    assert list(read_csv(str(path))) == [
+        (0, "web", 0, None, None),
+        (0, "web", 0, 4 * MS, 20 * MS),
+        (1 * MS, "db", 5, None, None),
+        (1 * MS, "db", 5, 10 * MS, 2 * MS),
+        (0, "web", 0, 3 * MS, None),
+        (1 * MS, "db", 5, 8 * MS, None),
+    ]
+
+
+def test_trace_workload_rejects_bad_order():
+    workload = TraceWorkload([(5, "a", 0, None, None), (1, "b", 0, None, None)])
+    assert workload.next_task() == ("a", 0, 5)
+    with pytest.raises(ValueError):
+        workload.next_task()
+    with pytest.raises(ValueError):
+        TraceWorkload([(0, "a", 0, 1, None)]).next_task()
+
+
+def test_exit_before_last_switch_is_one_task(tmp_path):
+    path = tmp_path / "sched.txt"
+    path.write_text("""\
+          <idle>-0     [000] d..2   200.000000: sched_switch: prev_comm=swapper/0 prev_pid=0 prev_prio=120 prev_state=R ==> next_comm=job next_pid=10 next_prio=120
+             job-10    [000] d..2   200.005000: sched_process_exit: comm=job pid=10 prio=120
+             job-10    [000] d..2   200.005100: sched_switch: prev_comm=job prev_pid=10 prev_prio=120 prev_state=X ==> next_comm=swapper/0 next_pid=0 next_prio=120
+""")
+    assert list(read_sched_switch(str(path))) == [(0, "job-10", 0, None, None), (0, "job-10", 0, 5 * MS, None)]
+
+
+def test_read_csv_needs_task_and_cpu_columns(tmp_path):
+    path = tmp_path / "trace.csv"
+    path.write_text("task,arrival,io\nweb,0.0,0.020\n")
+    with pytest.raises(ValueError, match="'cpu'"):
+        list(read_csv(str(path)))
+    path.write_text("")
+    with pytest.raises(ValueError, match="'task'"):
+        list(read_csv(str(path)))
@@ -0,0 +1,162 @@
+import argparse
+import json
+import mmap
+import struct
+import time
+from metrics import Metrics
+from weights import NSEC_PER_SEC
+
+# Binary scheduler traces. A trace is a header, a run of fixed-width records
+# and, once closed, the task names as JSON:
+#
+#   header  magic, version, record count, offset of the name table
+#   record  timestamp (ns), vruntime (ns), value (ns), task id, event, cpu
+#
+# `value` is the time slice for RUNNING, the vruntime charged for STOP and
+# the I/O duration for IO_START. Task ids index the name table.
+MAGIC = b"CFSTRACE"
+VERSION = 1
+HEADER = struct.Struct("<8sIxxxxqq")
+RECORD = struct.Struct("<qqqIBBxx")
+
+# Event types
+ARRIVE = 0
+RUNNING = 1
+STOP = 2
+IO_START = 3
+IO_COMPLETE = 4
+EXIT = 5
+
+
+# Appends records to a memory-mapped file, doubling it whenever it fills up.
+# Not thread-safe: the Scheduler only writes while holding its lock.
+class TraceWriter:
+    def __init__(self, path, capacity=1 << 16):
+        self.path = path
+        self.capacity = capacity
+        self.count = 0
+        self.names = []
+        self.file = open(path, "w+b")
+        self.map = None
+        self.remap()
+
+    def remap(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.truncate(HEADER.size + self.capacity * RECORD.size)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+
+    def register(self, task, name, timestamp):
+        while len(self.names) <= task:
+            self.names.append(None)
+        self.names[task] = name
+        self.write(timestamp, task, ARRIVE)
+
+    def write(self, timestamp, task, event, vruntime=0, value=0, cpu=0):
+        if self.count == self.capacity:
+            self.capacity *= 2
+            self.remap()
+        RECORD.pack_into(self.map, HEADER.size + self.count * RECORD.size,
+                         timestamp, vruntime, value, task, event, cpu)
+        self.count += 1
+
+    def close(self):
+        if self.map is None:
+            return
+        names_offset = HEADER.size + self.count * RECORD.size
+        HEADER.pack_into(self.map, 0, MAGIC, VERSION, self.count, names_offset)
+        self.map.close()
+        self.map = None
+        self.file.truncate(names_offset)
+        self.file.seek(names_offset)
+        self.file.write(json.dumps(self.names).encode())
+        self.file.close()
+
+
+# Read side of a closed trace. Iterating yields record tuples straight from
+# the mapping, so large traces are never loaded into memory.
+class TraceReader:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, names_offset = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} scheduler trace")
+        self.names = json.loads(self.map[names_offset:])
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        records = memoryview(self.map)[HEADER.size:HEADER.size + self.count * RECORD.size]
+        try:
+            yield from RECORD.iter_unpack(records)
+        finally:
+            records.release()
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def replay(path, notify_queue=None, metrics=None, speed=None):
+    # Feeds a recorded run to a Scene (through notify_queue, with the same
+    # messages the Scheduler sends) and to a Metrics object. speed=None
+    # replays as fast as possible, otherwise 2.0 is twice real time.
+    # Returns the metrics and the timestamp of the last record.
+    reader = TraceReader(path)
+    metrics = metrics if metrics is not None else Metrics(len(reader.names))
+    slots = {}
+    start = timestamp = None
+    started = time.monotonic()
+    try:
+        for timestamp, vruntime, value, task, event, cpu in reader:
+            if start is None:
+                start = timestamp
+            if speed:
+                delay = (timestamp - start) / NSEC_PER_SEC / speed - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            name = reader.names[task]
+            message = None
+            if event == ARRIVE:
+                slots[task] = metrics.register(name, timestamp)
+                message = {"name": name, "status": "new"}
+            elif event == RUNNING:
+                metrics.on_run(slots[task], timestamp)
+                message = {
+                    "name": name,
+                    "vRuntime": vruntime / NSEC_PER_SEC,
+                    "time_slice": value / NSEC_PER_SEC,
+                    "cpu": cpu,
+                    "status": "running"
+                }
+            elif event == STOP:
+                metrics.on_stop(slots[task], timestamp, value)
+            elif event == IO_START:
+                metrics.on_block(slots[task], timestamp)
+                message = {"name": name, "status": "io_start", "duration": value / NSEC_PER_SEC}
+            elif event == IO_COMPLETE:
+                metrics.on_runnable(slots[task], timestamp)
+                message = {"name": name, "status": "io_complete"}
+            elif event == EXIT:
+                metrics.on_exit(slots[task], timestamp)
+                message = {"name": name, "status": "terminated"}
+            if message is not None and notify_queue is not None:
+                notify_queue.put(message)
+    finally:
+        reader.close()
+    return metrics, timestamp
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded scheduler trace and report its metrics")
+    parser.add_argument("trace")
+    parser.add_argument("--speed", type=float, default=None, help="replay speed, default as fast as possible")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    metrics, end = replay(args.trace, speed=args.speed)
+    print(f"Replayed {args.trace} in {time.perf_counter() - started:.3f}s")
+    metrics.print_report(end or 0)
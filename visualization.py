@@ -0,0 +1,487 @@
+import ctypes
+import math
+import threading
+import time
+import numpy as np
+import pygame
+from pygame.locals import *
+from OpenGL.GL import *
+from OpenGL.GLUT import *
+from OpenGL.GLU import *
+from events import EventChannel
+from scheduler import Scheduler
+import tracing
+
+class Cube:
+    vertices = [
+        [-1, -1, -1], [1, -1, -1], [1, 1, -1], [-1, 1, -1],
+        [-1, -1, 1], [1, -1, 1], [1, 1, 1], [-1, 1, 1]
+    ]
+    edges = [
+        (0, 1), (1, 2), (2, 3), (3, 0),
+        (4, 5), (5, 6), (6, 7), (7, 4),
+        (0, 4), (1, 5), (2, 6), (3, 7)
+    ]
+    # The 12 edges as a line list, shared by every cube
+    edge_vertices = np.array(vertices, dtype=np.float32)[np.array(edges).ravel()]
+    # Axis the cubes spin around, as in glRotatef(angle, 4, 2, 3)
+    axis = np.array([4, 2, 3], dtype=np.float64) / math.sqrt(4 * 4 + 2 * 2 + 3 * 3)
+
+    batch = None
+
+    def __init__(self, position=(0, 0, 0), name="Cube"):
+        self.position = position
+        self.angle = 0
+        self.name = name
+
+    def draw(self):
+        if Cube.batch is None:
+            Cube.batch = CubeBatch()
+        Cube.batch.draw(np.array([self.position], dtype=np.float64), np.array([self.angle], dtype=np.float64))
+
+    def rotate(self, allowed):
+        if allowed:
+            self.angle += 120
+
+
+# Draws any number of cubes with one glDrawArrays call. The per-cube transforms
+# are applied on the CPU with NumPy (fixed-function GL has no instancing) and
+# the resulting line list is streamed into a single vertex buffer each frame.
+class CubeBatch:
+    def __init__(self):
+        self.vbo = None
+
+    def transform(self, positions, angles):
+        # Rodrigues' rotation of the shared edge list, one matrix per cube
+        theta = np.radians(angles)
+        cos, sin = np.cos(theta)[:, None, None], np.sin(theta)[:, None, None]
+        kx, ky, kz = Cube.axis
+        cross = np.array([[0, -kz, ky], [kz, 0, -kx], [-ky, kx, 0]])
+        rotations = cos * np.eye(3) + sin * cross + (1 - cos) * np.outer(Cube.axis, Cube.axis)
+        vertices = np.einsum("nij,vj->nvi", rotations, Cube.edge_vertices) + positions[:, None, :]
+        return vertices.astype(np.float32).reshape(-1, 3)
+
+    def draw(self, positions, angles):
+        if len(positions) == 0:
+            return
+        vertices = self.transform(positions, angles)
+        if self.vbo is None:
+            self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STREAM_DRAW)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glColor3f(1, 1, 1)
+        glDrawArrays(GL_LINES, 0, len(vertices))
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+
+class Circle:
+    def __init__(self, radius=3, num_segments=100, position=(0, 0, 0), name=""):
+        self.radius = radius
+        self.num_segments = num_segments
+        self.position = position
+        self.name = name
+        # The outline never changes, so it is computed once and uploaded on
+        # the first draw (a GL context may not exist yet)
+        theta = 2.0 * np.pi * np.arange(num_segments) / num_segments
+        self.vertices = np.column_stack((radius * np.cos(theta), radius * np.sin(theta))).astype(np.float32)
+        self.vbo = None
+
+    def draw(self):
+        if self.vbo is None:
+            self.vbo = glGenBuffers(1)
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+            glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, self.vertices, GL_STATIC_DRAW)
+        glPushMatrix()
+        glTranslatef(*self.position)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(2, GL_FLOAT, 0, None)
+        glDrawArrays(GL_LINE_LOOP, 0, self.num_segments)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glPopMatrix()
+
+# Where a task's cube is drawn
+QUEUED, RUNNING, IN_IO, GONE = range(4)
+
+
+class Scene:
+    def __init__(self, process_list, weights, notify_queue, backend="process", num_cpus=1, seed=None, trace_path=None,
+                 policy="cfs"):
+        self.notify_queue = notify_queue
+        self.scheduler = Scheduler(notify_queue, backend, num_cpus, seed=seed, trace_path=trace_path, policy=policy)
+        self.all_processes = process_list.copy()
+        self.vRuntimes = {proc: 0.0 for proc in process_list}
+        self.time_slices = {proc: 0.0 for proc in process_list}
+        self.io_processes = {}
+
+        # Cube state is indexed by slot (the task's position in process_list).
+        # `active` keeps the live tasks in order, and queued cubes fill columns
+        # 0..len(queue)-1: a cube leaving the queue hands its column to the
+        # last queued cube, so every transition moves at most two cubes.
+        count = len(process_list)
+        self.slots = {proc: i for i, proc in enumerate(process_list)}
+        self.active = dict(self.slots)
+        self.state = np.full(count, GONE, dtype=np.int8)
+        self.alive = np.ones(count, dtype=bool)
+        self.positions = np.zeros((count, 3))
+        self.angles = np.zeros(count)
+        self.task_cpus = np.full(count, -1, dtype=np.int64)
+        self.queue_index = np.full(count, -1, dtype=np.int64)
+        self.queue = []
+        self.cpu_tasks = {}
+
+        # One circle per simulated CPU, with the I/O circle after them
+        self.cpu_circles = [
+            Circle(position=(3 + cpu * 7, 6, 0), name="CPU" if num_cpus == 1 else f"CPU {cpu}")
+            for cpu in range(num_cpus)
+        ]
+        self.io_circle = Circle(position=(3 + num_cpus * 7 + 2, 6, 0), name="I/O")
+        self.cube_batch = CubeBatch()
+
+        for slot in range(count):
+            self.move(slot, QUEUED)
+
+    def draw(self):
+        self.cube_batch.draw(self.positions[self.alive], self.angles[self.alive])
+        for circle in self.cpu_circles:
+            circle.draw()
+        self.io_circle.draw()
+
+    def draw_io_progress(self,render_callback, display):
+        for i, (name, io) in enumerate(self.io_processes.items()):
+            elapsed = time.time() - io["start_time"]
+            progress = min(elapsed / io["duration"], 1.0)
+            render_callback(
+                f"{name} I/O: {progress*100:.0f}%", 
+                (display[0] - 150, 50 + i*30)
+            )
+
+    def update(self):
+        # Take everything the scheduler queued since the last frame in one go,
+        # after passing on any events left behind by a non-blocking flush
+        self.scheduler.flush(block=False)
+        for message in self.notify_queue.drain():
+            if message["status"] == "new":
+                if message["name"] not in self.slots:
+                    self.add(message["name"])
+                continue
+            slot = self.slots.get(message["name"])
+            if slot is None:
+                continue
+            process_name = message["name"]
+            status = message["status"]
+
+            if status == "running":
+                self.vRuntimes[process_name] = message.get("vRuntime", 0)
+                self.time_slices[process_name] = message.get("time_slice", 0)
+                if self.state[slot] == GONE:
+                    continue
+
+                # Whatever ran on that CPU before goes back to the queue
+                cpu = message.get("cpu", 0)
+                previous = self.cpu_tasks.get(cpu)
+                if previous is not None and previous != slot and self.state[previous] == RUNNING \
+                        and self.task_cpus[previous] == cpu:
+                    self.move(previous, QUEUED)
+                self.move(slot, RUNNING, cpu)
+                # Rotate only the running process
+                self.angles[slot] += 120
+
+            elif status == "terminated":
+                self.io_processes.pop(process_name, None)
+                self.move(slot, GONE)
+
+            elif status == "io_start":
+                if self.state[slot] != GONE:
+                    self.io_processes[process_name] = {
+                        "start_time": time.time(),
+                        "duration": message["duration"],
+                        "progress": 0
+                    }
+                    print(f"Process {process_name} entering I/O state for {message['duration']} seconds")
+                    self.move(slot, IN_IO)
+
+            elif status == "io_complete":
+                if process_name in self.io_processes:
+                    print(f"Process {process_name} completed I/O")
+                    del self.io_processes[process_name]
+                if self.state[slot] == IN_IO:
+                    self.move(slot, QUEUED)
+
+    def add(self, name):
+        # A task submitted while running takes the next slot; the arrays
+        # double when they fill up, so adding cubes is amortized O(1)
+        slot = len(self.all_processes)
+        if slot == len(self.state):
+            extra = max(slot, 1)
+            self.state = np.concatenate([self.state, np.full(extra, GONE, dtype=np.int8)])
+            self.alive = np.concatenate([self.alive, np.zeros(extra, dtype=bool)])
+            self.positions = np.concatenate([self.positions, np.zeros((extra, 3))])
+            self.angles = np.concatenate([self.angles, np.zeros(extra)])
+            self.task_cpus = np.concatenate([self.task_cpus, np.full(extra, -1, dtype=np.int64)])
+            self.queue_index = np.concatenate([self.queue_index, np.full(extra, -1, dtype=np.int64)])
+        self.all_processes.append(name)
+        self.vRuntimes[name] = 0.0
+        self.time_slices[name] = 0.0
+        self.slots[name] = self.active[name] = slot
+        self.alive[slot] = True
+        self.move(slot, QUEUED)
+        return slot
+
+    def move(self, slot, state, cpu=None):
+        # Take the cube out of wherever it is now...
+        old = self.state[slot]
+        if old == QUEUED:
+            index = self.queue_index[slot]
+            last = self.queue.pop()
+            if last != slot:
+                self.queue[index] = last
+                self.queue_index[last] = index
+                self.positions[last] = (index * 4, 0, 0)
+            self.queue_index[slot] = -1
+        elif old == RUNNING:
+            if self.cpu_tasks.get(self.task_cpus[slot]) == slot:
+                del self.cpu_tasks[self.task_cpus[slot]]
+            self.task_cpus[slot] = -1
+
+        # ...and put it where it belongs
+        self.state[slot] = state
+        if state == QUEUED:
+            self.queue_index[slot] = len(self.queue)
+            self.queue.append(slot)
+            self.positions[slot] = (self.queue_index[slot] * 4, 0, 0)
+        elif state == RUNNING:
+            self.cpu_tasks[cpu] = slot
+            self.task_cpus[slot] = cpu
+            self.positions[slot] = (self.cpu_circles[cpu].position[0], 6, 0)
+        elif state == IN_IO:
+            self.positions[slot] = (self.io_circle.position[0], 6, 0)
+        elif self.alive[slot]:
+            self.alive[slot] = False
+            del self.active[self.all_processes[slot]]
+
+
+# Rendered labels packed into one texture atlas, keyed on the label text.
+# Most labels are the same from one frame to the next, so font.render and the
+# upload only happen when a string is new. Labels are placed left to right on
+# shelves as tall as their tallest label. When the atlas fills up it is
+# emptied and the frame's labels are packed again, in an atlas twice as tall
+# if even those don't fit. Every label of a frame is then one quad in a
+# single vertex buffer, drawn with one glDrawArrays from the one texture.
+class TextCache:
+    def __init__(self, font, width=1024, height=256):
+        self.font = font
+        self.width = width
+        self.height = height
+        self.texture = None
+        self.vbo = None
+        self.entries = {}
+        self.shelf_top = 0
+        self.shelf_height = 0
+        self.cursor = 0
+
+    def reset(self):
+        # (Re)allocates the atlas empty, at its current size
+        if self.texture is None:
+            self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        # Labels are drawn texel for texel; nearest filtering keeps
+        # neighbouring labels from bleeding in at the edges
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, self.width, self.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        self.entries.clear()
+        self.shelf_top = self.shelf_height = self.cursor = 0
+
+    def get(self, text):
+        # (u0, v0, u1, v1, width, height) of the label, None if the atlas is full
+        entry = self.entries.get(text)
+        if entry is not None:
+            return entry
+        surface = self.font.render(text, True, (255, 255, 255))
+        width, height = min(surface.get_width(), self.width), surface.get_height()
+        if self.cursor + width > self.width:
+            self.shelf_top += self.shelf_height
+            self.shelf_height = self.cursor = 0
+        if self.shelf_top + height > self.height:
+            return None
+        x, y = self.cursor, self.shelf_top
+        self.cursor += width
+        self.shelf_height = max(self.shelf_height, height)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexSubImage2D(GL_TEXTURE_2D, 0, x, y, width, height, GL_RGBA, GL_UNSIGNED_BYTE,
+                        pygame.image.tostring(surface.subsurface((0, 0, width, height)), "RGBA", False))
+        entry = self.entries[text] = (x / self.width, y / self.height, (x + width) / self.width,
+                                      (y + height) / self.height, width, height)
+        return entry
+
+    def layout(self, labels):
+        # labels: [(text, (x, y))] -> float32 (x, y, u, v) per quad corner
+        if self.texture is None:
+            self.reset()
+        repacked = False
+        while True:
+            entries = [self.get(text) for text, _ in labels]
+            if None not in entries:
+                break
+            if repacked:
+                if self.height * 2 > int(glGetIntegerv(GL_MAX_TEXTURE_SIZE)):
+                    # Draw what fits rather than nothing
+                    break
+                self.height *= 2
+            self.reset()
+            repacked = True
+        boxes = np.array([(x, y) + entry for (_, (x, y)), entry in zip(labels, entries) if entry is not None],
+                         dtype=np.float32).reshape(-1, 8)
+        x, y, u0, v0, u1, v1, width, height = boxes.T
+        # Same placement as the old glRasterPos/glDrawPixels: the label's
+        # bottom-left corner sits at the given position
+        top, right = y - height, x + width
+        corners = [(x, top, u0, v0), (right, top, u1, v0), (right, y, u1, v1), (x, y, u0, v1)]
+        return np.stack([np.stack(corner, axis=1) for corner in corners], axis=1).reshape(-1, 4)
+
+    def draw(self, labels):
+        vertices = self.layout(labels)
+        if len(vertices) == 0:
+            return
+        if self.vbo is None:
+            self.vbo = glGenBuffers(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STREAM_DRAW)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        stride = vertices.itemsize * 4
+        glVertexPointer(2, GL_FLOAT, stride, None)
+        glTexCoordPointer(2, GL_FLOAT, stride, ctypes.c_void_p(vertices.itemsize * 2))
+        glDrawArrays(GL_QUADS, 0, len(vertices))
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+
+class App:
+    def __init__(self, process_list, niceness, backend="process", num_cpus=1, seed=None, trace_path=None, replay=None,
+                 speed=1.0, policy="cfs"):
+        pygame.init()
+        self.display = (1200, 600)
+        pygame.display.set_mode(self.display, DOUBLEBUF | OPENGL)
+        gluPerspective(45, (self.display[0]/self.display[1]), 0.1, 50.0)
+        glTranslatef(-4, -2, -20)
+        
+        # Scheduler threads and the render loop share one process, so events
+        # go through an in-process channel rather than a Manager queue
+        self.notify_queue = EventChannel()
+        if replay is not None:
+            # The tasks come from the trace; nothing is scheduled for real
+            reader = tracing.TraceReader(replay)
+            process_list, niceness = reader.names, [0] * len(reader.names)
+            reader.close()
+        self.scene = Scene(process_list, niceness, self.notify_queue, backend, num_cpus, seed, trace_path, policy)
+        self.running = True
+        self.font = pygame.font.Font(None, 24)
+        self.text_cache = TextCache(self.font)
+        self.text_queue = []
+        self.replaying = replay is not None
+        
+        if replay is not None:
+            self.scheduler_thread = threading.Thread(target=tracing.replay, args=(replay, self.notify_queue),
+                                                     kwargs={"speed": speed})
+        else:
+            # Keep the CPUs up when the tasks run out, so more can be added with N
+            self.scheduler_thread = threading.Thread(target=self.scene.scheduler.run_scheduler, args=(process_list, niceness),
+                                                     kwargs={"open_system": True, "capacity": 256})
+        self.scheduler_thread.daemon = True
+        self.scheduler_thread.start()
+
+    def render_text(self, text, position):
+        # Labels are queued and drawn together by draw_text() at the end of the frame
+        self.text_queue.append((text, position))
+
+    def draw_text(self):
+        glPushMatrix()
+        glLoadIdentity()
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        gluOrtho2D(0, self.display[0], self.display[1], 0)
+        glMatrixMode(GL_MODELVIEW)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glEnable(GL_TEXTURE_2D)
+        glColor3f(1, 1, 1)
+        self.text_cache.draw(self.text_queue)
+        glDisable(GL_TEXTURE_2D)
+        glDisable(GL_BLEND)
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPopMatrix()
+        self.text_queue.clear()
+
+    def run(self, process_list=[]):
+        clock = pygame.time.Clock()
+        while self.running:
+            for event in pygame.event.get():
+                if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
+                    self.running = False
+                elif event.type == KEYDOWN and event.key == K_n and not self.replaying:
+                    self.submit_task()
+
+            self.scene.update()
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            self.scene.draw()
+
+            # Render labels
+            for circle in self.scene.cpu_circles + [self.scene.io_circle]:
+                label_pos = self.project(*circle.position)
+                self.render_text(circle.name, (label_pos[0]-20, label_pos[1]-110))
+
+            # Render process names
+            for name, slot in self.scene.active.items():
+                screen_pos = self.project(*self.scene.positions[slot])
+                self.render_text(name, (screen_pos[0]-20, screen_pos[1]-50))
+
+            # Render metrics, for as many tasks as fit on the screen
+            rows = max(0, (self.display[1] - 50) // 40)
+            for i, proc_name in enumerate(self.scene.all_processes[:rows]):
+                runtime_text = f"{proc_name}: VRuntime {self.scene.vRuntimes.get(proc_name, 0):.2f}"
+                timeslice_text = f"Time Slice: {self.scene.time_slices.get(proc_name, 0):.2f}s"
+                self.render_text(runtime_text, (10, 50 + i*40))
+                self.render_text(timeslice_text, (10, 70 + i*40))
+
+            # Draw I/O progress
+            self.scene.draw_io_progress(self.render_text, self.display)
+            self.draw_text()
+
+            pygame.display.flip()
+            clock.tick(60)
+
+    def submit_task(self):
+        name = f"pro{len(self.scene.all_processes) + 1}"
+        try:
+            self.scene.scheduler.submit(name, nice=-10)
+        except (RuntimeError, ValueError) as e:
+            print(f"Could not add {name}: {e}")
+
+    def project(self, x, y, z):
+        modelview = glGetDoublev(GL_MODELVIEW_MATRIX)
+        projection = glGetDoublev(GL_PROJECTION_MATRIX)
+        viewport = glGetIntegerv(GL_VIEWPORT)
+        screen_pos = gluProject(x, y, z, modelview, projection, viewport)
+        return screen_pos[0], self.display[1] - screen_pos[1]
+
+    def quit(self):
+        print("Calling Quit")
+        self.running = False
+        # The open system never winds down by itself; stop the live workers
+        # so nothing outlives the window
+        if not self.replaying:
+            self.scene.scheduler.stop()
+        pygame.quit()
+
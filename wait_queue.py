@@ -0,0 +1,47 @@
+import heapq
+
+# Tasks blocked on I/O, ordered by the time their I/O completes. Waking the
+# next task and registering a new one are O(log n); removal is lazy.
+class WaitQueue:
+    def __init__(self):
+        self.heap = []
+        self.waiting = {}
+        self.seq = 0
+
+    def __len__(self):
+        return len(self.waiting)
+
+    def __contains__(self, process):
+        return process["name"] in self.waiting
+
+    def __iter__(self):
+        return (entry[2] for entry in self.heap if self.waiting.get(entry[2]["name"]) == entry[1])
+
+    def add(self, process, deadline):
+        self.seq += 1
+        self.waiting[process["name"]] = self.seq
+        heapq.heappush(self.heap, (deadline, self.seq, process))
+
+    def remove(self, process):
+        return self.waiting.pop(process["name"], None) is not None
+
+    def next_deadline(self):
+        self._drop_stale()
+        if not self.heap:
+            return None
+        return self.heap[0][0]
+
+    def pop_expired(self, now):
+        expired = []
+        self._drop_stale()
+        while self.heap and self.heap[0][0] <= now:
+            _, _, process = heapq.heappop(self.heap)
+            del self.waiting[process["name"]]
+            expired.append(process)
+            self._drop_stale()
+        return expired
+
+    def _drop_stale(self):
+        heap = self.heap
+        while heap and self.waiting.get(heap[0][2]["name"]) != heap[0][1]:
+            heapq.heappop(heap)
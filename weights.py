@@ -0,0 +1,58 @@
+# Nice level to load weight tables and fixed-point delta scaling, as in the
+# kernel's kernel/sched/core.c and kernel/sched/fair.c. All vRuntime
+# accounting is done in integer nanoseconds.
+
+NSEC_PER_SEC = 1000000000
+
+NICE_0_LOAD = 1024
+MIN_NICE = -20
+MAX_NICE = 19
+
+WMULT_SHIFT = 32
+WMULT_CONST = (1 << WMULT_SHIFT) - 1
+
+# sched_prio_to_weight: nice -20 .. 19, each step is roughly 1.25x
+sched_prio_to_weight = [
+    88761, 71755, 56483, 46273, 36291,
+    29154, 23254, 18705, 14949, 11916,
+    9548, 7620, 6100, 4904, 3906,
+    3121, 2501, 1991, 1586, 1277,
+    1024, 820, 655, 526, 423,
+    335, 272, 215, 172, 137,
+    110, 87, 70, 56, 45,
+    36, 29, 23, 18, 15,
+]
+
+# sched_prio_to_wmult: 2^32 / weight, precomputed
+sched_prio_to_wmult = [
+    48388, 59856, 76040, 92818, 118348,
+    147320, 184698, 229616, 287308, 360437,
+    449829, 563644, 704093, 875809, 1099582,
+    1376151, 1717300, 2157191, 2708050, 3363326,
+    4194304, 5237765, 6557202, 8165337, 10153587,
+    12820798, 15790321, 19976592, 24970740, 31350126,
+    39045157, 49367440, 61356676, 76695844, 95443717,
+    119304647, 148102320, 186737708, 238609294, 286331153,
+]
+
+WMULT_BY_WEIGHT = dict(zip(sched_prio_to_weight, sched_prio_to_wmult))
+
+
+def nice_to_weight(niceness):
+    # Out of range nice values are clamped, as setpriority() does
+    niceness = min(max(niceness, MIN_NICE), MAX_NICE)
+    return sched_prio_to_weight[niceness - MIN_NICE]
+
+
+def inverse_weight(weight):
+    inv = WMULT_BY_WEIGHT.get(weight)
+    if inv is None:
+        inv = WMULT_CONST // max(weight, 1)
+    return inv
+
+
+def calc_delta_fair(delta_exec, weight):
+    # delta_exec * NICE_0_LOAD / weight, in 32.32 fixed point
+    if weight == NICE_0_LOAD:
+        return delta_exec
+    return (delta_exec * NICE_0_LOAD * inverse_weight(weight)) >> WMULT_SHIFT
@@ -0,0 +1,107 @@
+import math
+from weights import NSEC_PER_SEC
+
+# Distribution specs, as accepted on the command line (values in seconds
+# unless noted):
+#   "3"               constant
+#   "uniform:2,4"     uniform float in [2, 4]
+#   "randint:5,15"    uniform integer in [5, 15]
+#   "exp:1.5"         exponential with mean 1.5
+#   "geom:0.3,0.5"    failed tries before a success with probability 0.3,
+#                     times 0.5 (e.g. 0.5s ticks until I/O is started)
+#   "choice:-10,0,5"  one of the listed values, equally likely
+class Distribution:
+    def __init__(self, spec):
+        self.spec = str(spec)
+        kind, _, params = self.spec.partition(":")
+        if not params:
+            kind, params = "const", kind
+        self.kind = kind
+        try:
+            self.params = [float(value) for value in params.split(",")]
+        except ValueError:
+            raise ValueError(f"Invalid distribution '{self.spec}'")
+        expected = {"const": 1, "uniform": 2, "randint": 2, "exp": 1, "geom": 2}
+        if kind == "choice":
+            if not self.params:
+                raise ValueError(f"Invalid distribution '{self.spec}'")
+        elif expected.get(kind) != len(self.params):
+            raise ValueError(f"Invalid distribution '{self.spec}'")
+        if kind == "geom" and not 0 < self.params[0] <= 1:
+            raise ValueError(f"Invalid distribution '{self.spec}': probability must be in (0, 1]")
+
+    def __str__(self):
+        return self.spec
+
+    def sample(self, rng):
+        params = self.params
+        if self.kind == "const":
+            return params[0]
+        if self.kind == "uniform":
+            return rng.uniform(params[0], params[1])
+        if self.kind == "randint":
+            return rng.randint(int(params[0]), int(params[1]))
+        if self.kind == "exp":
+            return rng.expovariate(1.0 / params[0]) if params[0] > 0 else 0.0
+        if self.kind == "geom":
+            if params[0] >= 1:
+                return 0.0
+            failures = int(math.log(1.0 - rng.random()) / math.log(1.0 - params[0]))
+            return failures * params[1]
+        return rng.choice(params)
+
+
+# The defaults reproduce ProcessCreate.worker: each 0.5s tick has a 30% chance
+# of starting I/O, which blocks for that tick plus 2-4s
+DEFAULT_NICE = "-10"
+DEFAULT_CPU_BURST = "geom:0.3,0.5"
+DEFAULT_IO_BURST = "uniform:2.5,4.5"
+DEFAULT_EXE_TIME = "randint:5,15"
+DEFAULT_INTERARRIVAL = "0"
+
+
+# What a simulated run looks like: how many tasks, their nice values and
+# arrival times, how long each runs on the CPU between I/O requests, how long
+# each I/O takes, and how much vRuntime a task accrues before it exits.
+class Workload:
+    def __init__(self, tasks=4, nice=DEFAULT_NICE, cpu_burst=DEFAULT_CPU_BURST, io_burst=DEFAULT_IO_BURST,
+                 exe_time=DEFAULT_EXE_TIME, interarrival=DEFAULT_INTERARRIVAL):
+        self.tasks = tasks
+        self.nice = Distribution(nice)
+        self.cpu_burst = Distribution(cpu_burst)
+        self.io_burst = Distribution(io_burst)
+        self.exe_time = Distribution(exe_time)
+        self.interarrival = Distribution(interarrival)
+        if tasks is None and self.interarrival.kind == "const" and self.interarrival.params[0] <= 0:
+            raise ValueError("An open workload (no task count) needs a positive interarrival time")
+
+    def describe(self):
+        return {
+            "tasks": self.tasks,
+            "nice": str(self.nice),
+            "cpu_burst": str(self.cpu_burst),
+            "io_burst": str(self.io_burst),
+            "exe_time": str(self.exe_time),
+            "interarrival": str(self.interarrival),
+        }
+
+    def arrivals(self, rng):
+        # Yields (name, nice, arrival in ns) one task at a time. With tasks=None
+        # the stream never ends, modelling an open system with a given arrival rate.
+        arrival = 0
+        i = 0
+        while self.tasks is None or i < self.tasks:
+            if i > 0:
+                arrival += int(self.interarrival.sample(rng) * NSEC_PER_SEC)
+            yield f"pro{i + 1}", int(self.nice.sample(rng)), arrival
+            i += 1
+
+    # Burst lengths are at least 1ns so a task always makes progress
+    def cpu_burst_ns(self, rng):
+        return max(1, int(self.cpu_burst.sample(rng) * NSEC_PER_SEC))
+
+    def io_burst_ns(self, rng):
+        return max(1, int(self.io_burst.sample(rng) * NSEC_PER_SEC))
+
+    def exe_time_ns(self, rng):
+        return int(self.exe_time.sample(rng) * NSEC_PER_SEC)
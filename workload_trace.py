@@ -0,0 +1,207 @@
+import csv
+import re
+from collections import deque
+from weights import MAX_NICE, MIN_NICE, NSEC_PER_SEC
+
+# Recorded workloads for the simulator. Both readers are generators that
+# yield one record at a time,
+#
+#   (arrival_ns, task, nice, cpu_ns, io_ns)
+#
+# A task's first record announces it, with cpu_ns and io_ns None, at the point
+# of the trace where it is first seen. Each later record means the task ran
+# for cpu_ns, then blocked for io_ns (None if it exited instead). Arrivals
+# come in non-decreasing order. The readers keep only per-task bookkeeping;
+# TraceWorkload buffers the bursts it reads ahead of the simulated clock, so
+# a trace in time order (as sched_switch output is) streams in bounded memory.
+
+
+# CSV with a header row and one row per CPU burst. Durations and times are in
+# seconds; `arrival` and `nice` are optional and taken from a task's first row,
+# an empty `io` means the task exits after that burst. Tasks must first appear
+# in arrival order. Rows of different tasks may be interleaved; keeping them
+# roughly in the order they happen (rather than grouped by task) keeps the
+# read-ahead small.
+#
+#   task,arrival,nice,cpu,io
+#   web,0.0,0,0.004,0.020
+#   db,0.001,5,0.010,0.002
+#   web,0.0,0,0.003,
+#   db,0.001,5,0.008,
+def read_csv(path):
+    seen = set()
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        for column in ("task", "cpu"):
+            if column not in (reader.fieldnames or []):
+                raise ValueError(f"CSV trace has no '{column}' column")
+        for row in reader:
+            arrival = int(float(row.get("arrival") or 0) * NSEC_PER_SEC)
+            nice = int(row.get("nice") or 0)
+            if row["task"] not in seen:
+                seen.add(row["task"])
+                yield (arrival, row["task"], nice, None, None)
+            io = row.get("io") or ""
+            yield (
+                arrival,
+                row["task"],
+                nice,
+                max(1, int(float(row["cpu"]) * NSEC_PER_SEC)),
+                max(1, int(float(io) * NSEC_PER_SEC)) if io.strip() else None,
+            )
+
+
+# ftrace/perf text output with sched_switch events, plus sched_wakeup,
+# sched_wakeup_new and sched_process_exit when present:
+#
+#   bash-1234 [001] d..2 5123.001000: sched_switch: prev_comm=bash prev_pid=1234 prev_prio=120 prev_state=S ==> next_comm=swapper/1 next_pid=0 next_prio=120
+#
+# A CPU burst is all the time a task spends switched in between two blocking
+# switches (preemptions with prev_state=R don't end it). The I/O burst lasts
+# until its wakeup, or until it is switched in again if wakeups were not traced.
+# A task exits at sched_process_exit, or at a switch-out with prev_state X/Z
+# when exits were not traced.
+# Arrivals are relative to the first event in the file.
+LINE = re.compile(r"\s(\d+\.\d+):\s+(\w+):\s+(.*)$")
+FIELD = re.compile(r"(\w+)=(\S+)")
+
+
+def prio_to_nice(prio):
+    return min(max(prio - 120, MIN_NICE), MAX_NICE)
+
+
+def read_sched_switch(path):
+    tasks = {}
+    start = None
+    # Records produced by the current line; a task's arrival goes out before
+    # anything else the same line produces for it
+    arrivals = []
+    records = []
+    # A pid reused after an exit is a new task, named comm-pid.2 and so on
+    generations = {}
+    # ftrace logs sched_process_exit before the task's last switch-out
+    # (prev_state=X or Z); pids that exited but haven't switched out yet
+    exited = set()
+
+    def task(pid, comm, prio, now):
+        state = tasks.get(pid)
+        if state is None:
+            name = f"{comm}-{pid}"
+            generation = generations[name] = generations.get(name, 0) + 1
+            if generation > 1:
+                name = f"{name}.{generation}"
+            exited.discard(pid)
+            state = tasks[pid] = {"name": name, "arrival": now - start, "nice": prio_to_nice(prio),
+                                  "on_cpu": None, "cpu": 0, "blocked": None}
+            arrivals.append((state["arrival"], state["name"], state["nice"], None, None))
+        return state
+
+    def end_io(state, now):
+        io = max(1, now - state["blocked"])
+        state["blocked"] = None
+        cpu, state["cpu"] = state["cpu"], 0
+        return (state["arrival"], state["name"], state["nice"], max(1, cpu), io)
+
+    with open(path) as f:
+        for line in f:
+            match = LINE.search(line)
+            if match is None:
+                continue
+            now = int(float(match.group(1)) * NSEC_PER_SEC)
+            if start is None:
+                start = now
+            event = match.group(2)
+            fields = dict(FIELD.findall(match.group(3)))
+            if event == "sched_switch":
+                prev, nxt = fields.get("prev_pid"), fields.get("next_pid")
+                prev_state = fields.get("prev_state", "R")
+                if prev in exited and prev_state[0] in "XZ":
+                    exited.discard(prev)
+                elif prev is not None and prev != "0":
+                    state = task(prev, fields.get("prev_comm", "task"), int(fields.get("prev_prio", 120)), now)
+                    if state["on_cpu"] is not None:
+                        state["cpu"] += now - state["on_cpu"]
+                        state["on_cpu"] = None
+                    if prev_state[0] in "XZ":
+                        records.append((state["arrival"], state["name"], state["nice"], max(1, state["cpu"]), None))
+                        del tasks[prev]
+                    elif prev_state[0] != "R":
+                        state["blocked"] = now
+                if nxt is not None and nxt != "0":
+                    state = task(nxt, fields.get("next_comm", "task"), int(fields.get("next_prio", 120)), now)
+                    if state["blocked"] is not None:
+                        records.append(end_io(state, now))
+                    state["on_cpu"] = now
+            elif event in ("sched_wakeup", "sched_wakeup_new"):
+                pid = fields.get("pid")
+                if pid is None or pid == "0":
+                    continue
+                state = task(pid, fields.get("comm", "task"), int(fields.get("prio", 120)), now)
+                if state["blocked"] is not None:
+                    records.append(end_io(state, now))
+            elif event == "sched_process_exit":
+                state = tasks.pop(fields.get("pid"), None)
+                if state is not None:
+                    exited.add(fields.get("pid"))
+                    if state["on_cpu"] is not None:
+                        state["cpu"] += now - state["on_cpu"]
+                    records.append((state["arrival"], state["name"], state["nice"], max(1, state["cpu"]), None))
+            yield from arrivals
+            yield from records
+            arrivals.clear()
+            records.clear()
+    # Tasks still alive when the trace ends exit after their last burst
+    for state in tasks.values():
+        yield (state["arrival"], state["name"], state["nice"], max(1, state["cpu"]), None)
+
+
+def read_trace(path):
+    return read_csv(path) if path.endswith(".csv") else read_sched_switch(path)
+
+
+# Hands records to the Simulation on demand: next_task() returns the next
+# task to arrive, next_burst() a known task's next (cpu_ns, io_ns). Records
+# read ahead for other tasks wait in per-task queues until used; a task's
+# queue is dropped once its last burst is taken.
+class TraceWorkload:
+    def __init__(self, records):
+        self.records = iter(records)
+        self.bursts = {}
+        self.new_tasks = deque()
+        self.last_arrival = 0
+
+    def pull(self):
+        record = next(self.records, None)
+        if record is None:
+            return False
+        arrival, name, nice, cpu, io = record
+        if cpu is None:
+            if arrival < self.last_arrival:
+                raise ValueError(f"Trace arrivals are out of order: {name} arrives at {arrival / NSEC_PER_SEC:.6f}s, "
+                                 f"after a task that arrived at {self.last_arrival / NSEC_PER_SEC:.6f}s")
+            if name in self.bursts:
+                raise ValueError(f"Task {name} arrives twice in the trace")
+            self.last_arrival = arrival
+            self.bursts[name] = deque()
+            self.new_tasks.append((name, nice, arrival))
+        elif name not in self.bursts:
+            raise ValueError(f"Trace has a burst for {name} before its arrival")
+        else:
+            self.bursts[name].append((cpu, io))
+        return True
+
+    def next_task(self):
+        while not self.new_tasks:
+            if not self.pull():
+                return None
+        return self.new_tasks.popleft()
+
+    def next_burst(self, name):
+        bursts = self.bursts[name]
+        while not bursts:
+            if not self.pull():
+                return None
+        burst = bursts.popleft()
+        if burst[1] is None and not bursts:
+            del self.bursts[name]
+        return burst